@@ -1,28 +1,34 @@
 # Recovery Score Calculations: CSV_helper Script
 # Script created  8/10/2024
-# Last revision 12/13/2024
+# Last revision 10/19/2026
 
 import csv
 import pandas as pd
 from datetime import datetime
 
+import config
+
 class CSV:
     CSV_FILE:str = 'RS_output.csv'
-    COLUMNS: list[str] = ['Date', 'Case_Number', 'jerk_threshold', 'mean_jerk', 'std_jerk', 'jerk_threshold_cal', 'threshold', 'Number_failed_attempts', 'sa_2axes_py', 'sumua_py', 'rs_2axes_py']
+    COLUMNS: list[str] = ['Date', 'Case_Number', 'jerk_threshold', 'mean_jerk', 'std_jerk', 'jerk_threshold_cal', 'threshold', 'Number_failed_attempts', 'sa_2axes_py', 'sumua_py', 'rs_2axes_py', 'factor', 'percentile', 'detector']
     FORMAT:str = '%m-%d-%Y'
     
     @classmethod
     def initialize_csv(cls) -> None:
         '''
         Initializes the CSV file. If the file does not exist, it creates a new CSV file
-        with the specified columns. If the file exists, it reads the file
+        with the specified columns. If the file exists, it reads the file; a file written
+        before columns were added is rewritten once with the new (empty) columns
         
         Raises:
             FileNotFoundError: If the CSV file does not exist.
         '''
         
         try:
-            pd.read_csv(cls.CSV_FILE)
+            # Only the header is read, so logging a run does not get slower as the history grows
+            columns: list[str] = list(pd.read_csv(cls.CSV_FILE, nrows = 0).columns)
+            if columns != cls.COLUMNS and set(columns) <= set(cls.COLUMNS):
+                pd.read_csv(cls.CSV_FILE, dtype = str).reindex(columns = cls.COLUMNS).to_csv(cls.CSV_FILE, index = False)
 
         except FileNotFoundError:
             # Creates a new CSV file with the specified columns
@@ -31,8 +37,9 @@ class CSV:
             df.to_csv(cls.CSV_FILE, index = False)
 
     @classmethod
-    def add_entry(cls, date, case_number, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, rs_2axes_py) -> None:
-        '''Adds a new entry to the CSV file
+    def add_entry(cls, date, case_number, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, rs_2axes_py, detector = 'sd') -> None:
+        '''Adds a new entry to the CSV file. The FACTOR and PERCENTILE used to calibrate the
+        threshold are logged from config with it
             
         Args:
             date (str): The date of the entry
@@ -45,7 +52,8 @@ class CSV:
             number_failed_attempts (int): The number of failed attempts
             sa_2axes (float): The value for sa_2axes
             sumua (float or None): The value for sumua. If None, it will be replaced with an empty string.
-            rs_2axes_py (float): The value for rs_2axes_py    
+            rs_2axes_py (float): The value for rs_2axes_py
+            detector (str): The detector whose signal mean_jerk, std_jerk and jerk_threshold_cal describe ('sd' or 'energy')
          
         Returns:
             None
@@ -60,7 +68,10 @@ class CSV:
             'Number_failed_attempts': number_failed_attempts,
             'sa_2axes_py': sa_2axes,
             'sumua_py': sumua,
-            'rs_2axes_py': rs_2axes_py   
+            'rs_2axes_py': rs_2axes_py,
+            'factor': config.FACTOR,
+            'percentile': config.PERCENTILE,
+            'detector': detector,
         }
 
         with open(cls.CSV_FILE, 'a', newline = '') as csvfile:
@@ -71,7 +82,7 @@ class CSV:
             writer.writerow(new_entry)
         print('Entry added successfully')      
 
-def add_ua(file_path: str, jerk_threshold: float, mean_jerk: float, std_jerk: float, jerk_threshold_cal: float, number_failed_attempts: int, sa_2axes: float, sumua: float, rs_2axes_py: float) -> None:
+def add_ua(file_path: str, jerk_threshold: float, mean_jerk: float, std_jerk: float, jerk_threshold_cal: float, number_failed_attempts: int, sa_2axes: float, sumua: float, rs_2axes_py: float, detector: str = 'sd') -> None:
     '''Adds new UA entry to a CSV file
 
     Args:
@@ -85,13 +96,14 @@ def add_ua(file_path: str, jerk_threshold: float, mean_jerk: float, std_jerk: fl
         sa_2axes (float): calculated score using data from 2 axes (X and Y)
         sumua (float): calculated score using data from all axes
         rs_2_axes_py: calculated recovery score for 2 axes
+        detector (str): detector the jerk statistics come from ('sd' or 'energy')
     '''
     CSV.initialize_csv()
     date:str = get_date()
     case_number: str = rename(file_path)
-    CSV.add_entry(date, case_number, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, rs_2axes_py)
+    CSV.add_entry(date, case_number, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, rs_2axes_py, detector)
 
-def add_sa(file_path :str, jerk_threshold: float, mean_jerk: float, std_jerk: float, jerk_threshold_cal: float, number_failed_attempts: int, sa_2axes: float, rs_2axes_py: float) -> None:
+def add_sa(file_path :str, jerk_threshold: float, mean_jerk: float, std_jerk: float, jerk_threshold_cal: float, number_failed_attempts: int, sa_2axes: float, rs_2axes_py: float, detector: str = 'sd') -> None:
     '''Adds entry for a single and successful attempt to a CSV file
 
     Args:
@@ -105,13 +117,14 @@ def add_sa(file_path :str, jerk_threshold: float, mean_jerk: float, std_jerk: fl
         sa_2axes (float): the score for when there is only one successful attempt
         sumua (None): in a single and successful attempt, there is no value for sumua
         rs_2axes_py (float): recovery score for 2 axes
+        detector (str): detector the jerk statistics come from ('sd' or 'energy')
     '''
     CSV.initialize_csv()
     date:str = get_date()
     case_number: str = rename(file_path)
     sumua = None
     #number_failed_attempts_jerk = number_failed_attempts_jerk
-    CSV.add_entry(date, case_number, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, rs_2axes_py)
+    CSV.add_entry(date, case_number, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, rs_2axes_py, detector)
 
 def get_date() -> str:
     '''Generates a timestamp for the backup file
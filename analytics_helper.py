@@ -0,0 +1,190 @@
+# Recovery Score Calculations: Analytics helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: summarizes the run history in RS_output.csv (CSV.add_entry) without loading it at once.
+# The file is read in chunks of ANALYTICS_CHUNK_ROWS rows and every chunk is folded into mergeable
+# summaries (RunningStats, QuantileSketch), so memory depends on the number of groups (days,
+# cases, threshold settings), not on the number of runs logged. Writes three tables:
+#   summary_by_date.csv       runs per day, distinct cases and score statistics
+#   summary_by_case.csv       latest run of every case (later rows win ties) and its number of runs
+#   summary_by_threshold.csv  score and attempt statistics per threshold setting (SETTING_COLUMNS), using the
+#                             latest run of every case under each setting. Runs logged before 'detector',
+#                             'factor' and 'percentile' were added to the results file have them empty (own group)
+# Usage: python analytics_helper.py [results csv] [--output folder] [--chunk-rows N]
+
+import argparse
+import csv
+import os
+
+from typing import Iterator
+
+import pandas as pd
+
+import config
+
+from CSV_helper import CSV
+from stats_helper import QuantileSketch, RunningStats
+
+DATE_FORMAT: str = '%Y-%m-%d_%H.%M'  # format written by CSV_helper.get_date
+NUMERIC_COLUMNS: list[str] = ['jerk_threshold', 'mean_jerk', 'std_jerk', 'jerk_threshold_cal', 'Number_failed_attempts', 'sa_2axes_py', 'sumua_py', 'rs_2axes_py', 'factor', 'percentile']
+SETTING_COLUMNS: list[str] = ['detector', 'jerk_threshold', 'factor', 'percentile']  # settings the threshold depends on
+
+class GroupSummary:
+    '''
+    Number of runs and mergeable statistics of the scores and attempts of one group of runs
+    '''
+
+    def __init__(self) -> None:
+        self.runs: int = 0
+        self.cases: set[str] = set()
+        self.rs = RunningStats()
+        self.rs_sketch = QuantileSketch()
+        self.attempts = RunningStats()
+
+    def update(self, rows: pd.DataFrame) -> None:
+        '''
+        Adds a block of runs of this group
+
+        Args:
+            rows (pd.DataFrame): rows of the results file
+        '''
+        self.runs += len(rows)
+        self.cases.update(rows['Case_Number'])
+        rs = rows['rs_2axes_py'].dropna().to_numpy()
+        self.rs.update(rs)
+        self.rs_sketch.update(rs)
+        self.attempts.update(rows['Number_failed_attempts'].dropna().to_numpy())
+
+    def get_row(self) -> dict:
+        '''
+        Returns:
+            dict: columns of the summary tables
+        '''
+        return {
+            'runs': self.runs,
+            'cases': len(self.cases),
+            'rs_count': self.rs.count,
+            'rs_mean': self.rs.mean if self.rs.count else None,
+            'rs_std': self.rs.std if self.rs.count else None,
+            'rs_median': self.rs_sketch.percentile(50) if self.rs.count else None,
+            'mean_failed_attempts': self.attempts.mean if self.attempts.count else None,
+        }
+
+def read_results(file_path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    '''
+    Reads a results file chunk by chunk, with parsed dates and numbers
+
+    Args:
+        file_path (str): results csv (CSV.COLUMNS)
+        chunk_rows (int): rows per chunk
+
+    Yields:
+        pd.DataFrame: chunk of rows, plus 'run_time' (NaT if the date can not be parsed), 'day'
+            and 'row' (position in the file, to break ties between runs logged in the same minute).
+            Columns missing from older results files are added empty
+    '''
+    first_row: int = 0
+    for chunk in pd.read_csv(file_path, chunksize = chunk_rows, dtype = {'Case_Number': str, 'Date': str}):
+        for column in CSV.COLUMNS:
+            if column not in chunk:
+                chunk[column] = None
+        for column in NUMERIC_COLUMNS:
+            chunk[column] = pd.to_numeric(chunk[column], errors = 'coerce')
+        chunk['run_time'] = pd.to_datetime(chunk['Date'], format = DATE_FORMAT, errors = 'coerce')
+        chunk['day'] = chunk['run_time'].dt.strftime('%Y-%m-%d').fillna('unknown')
+        chunk['row'] = range(first_row, first_row + len(chunk))
+        first_row += len(chunk)
+        yield chunk
+
+def get_latest(latest: dict[tuple, dict], chunk: pd.DataFrame, key_columns: list[str]) -> None:
+    '''
+    Keeps the latest run of every combination of values of 'key_columns' ('latest' is updated in place)
+
+    Args:
+        latest (dict[tuple, dict]): latest row by key (values of 'key_columns', None if empty)
+        chunk (pd.DataFrame): chunk returned by read_results
+        key_columns (list[str]): columns identifying the runs that replace each other
+    '''
+    # Runs without a date sort before the dated ones; equal dates keep the later row
+    order = chunk.assign(sort_time = chunk['run_time'].fillna(pd.Timestamp.min)).sort_values(['sort_time', 'row'])
+    for row in order.drop_duplicates(key_columns, keep = 'last').to_dict('records'):
+        key: tuple = tuple(None if pd.isna(row[column]) else row[column] for column in key_columns)
+        previous: dict | None = latest.get(key)
+        if previous is None or (row['sort_time'], row['row']) >= (previous['sort_time'], previous['row']):
+            latest[key] = row
+
+def summarize_results(file_path: str, chunk_rows: int = config.ANALYTICS_CHUNK_ROWS) -> tuple[list[dict], list[dict], list[dict]]:
+    '''
+    Groups the run history by date, case and threshold setting
+
+    Args:
+        file_path (str): results csv
+        chunk_rows (int): rows read at a time
+
+    Returns:
+        tuple[list[dict], list[dict], list[dict]]: rows of the summaries by date, by case and by threshold
+    '''
+    by_date: dict[str, GroupSummary] = {}
+    latest: dict[tuple, dict] = {}
+    latest_by_setting: dict[tuple, dict] = {}
+    runs_per_case: dict[str, int] = {}
+
+    for chunk in read_results(file_path, chunk_rows):
+        for day, rows in chunk.groupby('day'):
+            by_date.setdefault(day, GroupSummary()).update(rows)
+        for case, runs in chunk['Case_Number'].value_counts().items():
+            runs_per_case[case] = runs_per_case.get(case, 0) + int(runs)
+        get_latest(latest, chunk, ['Case_Number'])
+        get_latest(latest_by_setting, chunk, ['Case_Number', *SETTING_COLUMNS])
+
+    date_rows: list[dict] = [{'day': day, **by_date[day].get_row()} for day in sorted(by_date)]
+
+    case_rows: list[dict] = []
+    for (case,), row in sorted(latest.items(), key = lambda item: str(item[0][0])):
+        case_rows.append({
+            'Case_Number': case,
+            'runs': runs_per_case[case],
+            **{column: row[column] for column in CSV.COLUMNS if column != 'Case_Number'},
+        })
+
+    # Threshold settings are compared on the latest run of each case under each setting, so
+    # reruns do not count twice and a case rerun with another setting still counts for both
+    threshold_rows: list[dict] = []
+    if latest_by_setting:
+        for setting, rows in pd.DataFrame(list(latest_by_setting.values())).groupby(SETTING_COLUMNS, dropna = False):
+            summary = GroupSummary()
+            summary.update(rows)
+            threshold_rows.append({**dict(zip(SETTING_COLUMNS, setting)), **summary.get_row()})
+
+    return date_rows, case_rows, threshold_rows
+
+def write_table(file_path: str, rows: list[dict]) -> None:
+    '''
+    Writes a list of rows to a csv file (nothing is written if there are no rows)
+    '''
+    if not rows:
+        return
+
+    with open(file_path, 'w', newline = '') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames = list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description = 'Summaries of the results file by date, case and threshold')
+    parser.add_argument('results', nargs = '?', default = CSV.CSV_FILE, help = 'results csv')
+    parser.add_argument('--output', default = config.ANALYTICS_OUTPUT, help = 'folder for the summary tables')
+    parser.add_argument('--chunk-rows', type = int, default = config.ANALYTICS_CHUNK_ROWS, help = 'rows read at a time')
+    args = parser.parse_args()
+
+    date_rows, case_rows, threshold_rows = summarize_results(args.results, args.chunk_rows)
+
+    os.makedirs(args.output, exist_ok = True)
+    for name, rows in [('summary_by_date.csv', date_rows), ('summary_by_case.csv', case_rows), ('summary_by_threshold.csv', threshold_rows)]:
+        write_table(os.path.join(args.output, name), rows)
+        print(f'{name}: {len(rows)} rows')
+
+if __name__ == "__main__":
+
+    main()
@@ -1,6 +1,6 @@
 # Recovery Score Calculations: Identification of Regions of Interest helper
 # Script created  3/25/2024
-# Last revision 5/22/2025
+# Last revision 10/19/2026
 
 import numpy as np
 
@@ -48,6 +48,67 @@ def calculate_window_sd(df, window_size, step_size)-> list:
     
     return sd_list
 
+def get_magnitude_deviation(df) -> np.ndarray:
+    '''
+    Acceleration magnitude sqrt(Acc_X^2 + Acc_Y^2 + Acc_Z^2) minus its mean, the signal of the
+    energy detector. The mean (gravity) is removed so the threshold is set on the movement only
+
+    Args:
+        df: DataFrame with the Butterworth filtered Acc_X, Acc_Y and Acc_Z
+
+    Returns:
+        NDArray[np.float64]: magnitude deviation per sample
+    '''
+    magnitude = np.sqrt(np.square(df[['Acc_X', 'Acc_Y', 'Acc_Z']].to_numpy(dtype = np.float64)).sum(axis = 1))
+
+    return magnitude - magnitude.mean()
+
+def calculate_moving_energy(signal, window_size) -> np.ndarray:
+    '''
+    Short-time energy of a signal around its local mean (the variance of every window of
+    'window_size' samples, one value per sample) computed with FFT based convolution
+    (scipy.signal.fftconvolve), so the cost does not depend on the window size
+
+    Args:
+        signal: 1-D signal (e.g. get_magnitude_deviation)
+        window_size: window size
+
+    Returns:
+        NDArray[np.float64]: energy of the window starting at each sample (len(signal) - window_size + 1 values)
+    '''
+    from scipy.signal import fftconvolve
+
+    signal = np.asarray(signal, dtype = np.float64)
+    if len(signal) < window_size:
+        return np.empty(0)
+
+    # Centered first: E[x^2] - E[x]^2 loses precision on a signal with a large offset
+    signal = signal - signal.mean()
+    box = np.full((1, window_size), 1.0 / window_size)
+    # Both moving means in one call (one FFT of the box)
+    mean, mean_square = fftconvolve(np.stack([signal, np.square(signal)]), box, mode = 'valid', axes = 1)
+
+    # FFT rounding can leave tiny negative values on flat stretches
+    return np.maximum(mean_square - np.square(mean), 0.0)
+
+def calculate_window_energy(signal, window_size, step_size) -> list:
+    '''
+    Energy detector: RMS of the short-time energy (calculate_moving_energy) on the same window
+    grid as calculate_window_sd, so detect_roi_sd, get_indexes and the plots use it unchanged.
+    On the same signal it gives the same values as calculate_window_sd
+
+    Args:
+        signal: 1-D signal (e.g. get_magnitude_deviation)
+        window_size: window size
+        step_size: number of data points by which the window advances
+
+    Returns:
+        list of float values
+    '''
+    print('calculating window_energy...')
+
+    return np.sqrt(calculate_moving_energy(signal, window_size)[::step_size]).tolist()
+
 def detect_roi_sd(AccZ_sd: list, threshold: float) -> list:
     '''
     Identifies Regions of Interest (ROI) using the first derivative signal based on a threshold criterion
@@ -99,4 +160,18 @@ def get_indexes(roi: list, window: int, step) -> list[list[int]]:
         end = start + window
         indexes.append([start, end])
 
-    return indexes
\ No newline at end of file
+    return indexes
+
+def map_indexes_to_original(indexes: list[list[int]], factor: int) -> list[list[int]]:
+    '''
+    Converts ROI indexes found on a decimated signal (apply_decimation) into indexes of the
+    original signal, so they can be used with extract_accel_values_from_roi
+
+    Args:
+        indexes: list with the indexes of the regions of interest (get_indexes) on the decimated signal
+        factor: decimation factor
+
+    Returns:
+        list with the indexes of the regions of interest on the original signal
+    '''
+    return [[start * factor, end * factor] for start, end in indexes]
@@ -0,0 +1,280 @@
+# Recovery Score Calculations: Benchmark Script
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: measures the performance budgets of the analysis.
+# Run with 'python benchmark.py [case numbers or folders]'. Exits with status 1 if a budget is exceeded.
+# With cases, the SD and energy detectors are also compared on them (agreement report).
+# Throughputs (detectors, streaming kernel) are reported only, they have no budget.
+# Also runs regression self-checks of the timestamp repair (check_timestamp_glitch).
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Modules that must not be imported by a '--no-plot' scoring run
+HEAVY_MODULES: list[str] = ['matplotlib', 'PyQt6', 'scipy.signal']
+# The modules are imported in subprocesses started here, wherever the benchmark is run from
+SCRIPT_DIR: str = os.path.dirname(os.path.abspath(__file__))
+
+def measure_import_time(module: str, runs: int = 5) -> float:
+    '''
+    Measures the cumulative import time of a module using 'python -X importtime'.
+    Each run uses a fresh interpreter. The best (minimum) run is returned so that
+    disk cache effects of the first run do not count against the budget
+
+    Args:
+        module (str): name of the module to import
+        runs (int): number of interpreters to start
+
+    Returns:
+        float: cumulative import time in milliseconds
+    '''
+    pattern = re.compile(r'import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)\s*$')
+    times_ms: list[float] = []
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output = True,
+            text = True,
+            check = True,
+            cwd = SCRIPT_DIR,
+        )
+        for line in result.stderr.splitlines():
+            match = pattern.match(line)
+            # The top level entry (no indentation) for the module holds the cumulative time in us
+            if match and match.group(2) == module:
+                times_ms.append(int(match.group(1)) / 1000)
+
+    return min(times_ms)
+
+def get_loaded_heavy_modules(module: str) -> list[str]:
+    '''
+    Imports a module in a fresh interpreter and lists which of the HEAVY_MODULES were loaded with it
+
+    Args:
+        module (str): name of the module to import
+
+    Returns:
+        list[str]: heavy modules found in sys.modules after the import
+    '''
+    code: str = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True, check = True, cwd = SCRIPT_DIR)
+    loaded: str = result.stdout.strip()
+
+    return loaded.split(',') if loaded else []
+
+def check_import_budget() -> bool:
+    '''
+    Checks that importing main.py stays within config.IMPORT_TIME_BUDGET_MS
+    and that it does not import the plotting or scipy modules
+
+    Returns:
+        bool: True if the budget is met
+    '''
+    import_time_ms: float = measure_import_time('main')
+    loaded: list[str] = get_loaded_heavy_modules('main')
+
+    print(f'import main: {import_time_ms:.1f} ms (budget {config.IMPORT_TIME_BUDGET_MS:.1f} ms)')
+    if loaded:
+        print(f'heavy modules imported at startup: {loaded}')
+
+    return import_time_ms <= config.IMPORT_TIME_BUDGET_MS and not loaded
+
+def check_timestamp_glitch(n: int = 300000) -> bool:
+    '''
+    Regression check of validate_timestamps: a single timestamp glitched far into the future must
+    cost one sample (not every sample after it) with every repairing policy, and a case whose
+    samples are mostly out of order must be rejected
+
+    Args:
+        n (int): number of samples
+
+    Returns:
+        bool: True if the checks pass
+    '''
+    from timestamp_helper import validate_timestamps
+
+    period_ns: int = int(1e9 / config.FS)
+    time_ns = np.arange(n, dtype = np.int64) * period_ns
+    accel = np.random.default_rng(0).standard_normal((n, 3))
+
+    def get_case(time_ns: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({'timeStamp': time_ns.astype('datetime64[ns]'), 'Acc_X': accel[:, 0], 'Acc_Y': accel[:, 1], 'Acc_Z': accel[:, 2]})
+
+    glitched = time_ns.copy()
+    glitched[1000] += 3600 * 10**9  # one sample an hour ahead
+    passed: bool = True
+    for policy in ['drop', 'average', 'resample']:
+        df, report = validate_timestamps(get_case(glitched), policy)
+        expected: int = n if policy == 'resample' else n - 1
+        ok: bool = df is not None and report['samples_out'] == expected and 1000 not in df.index
+        print(f"timestamp glitch ({policy}): {report['samples_in']} samples in, {report['samples_out']} out{'' if ok else ' (expected ' + str(expected) + ')'}")
+        passed &= ok
+
+    shuffled = time_ns.copy()
+    np.random.default_rng(1).shuffle(shuffled[: n // 2])
+    df, report = validate_timestamps(get_case(shuffled), 'average')
+    print(f"timestamps half shuffled: {'rejected' if report['rejected'] else 'not rejected'}")
+
+    return passed and df is None
+
+def benchmark_detectors(n: int = 360000, window_sizes: tuple[int, ...] = (1000, 4000, 16000)) -> None:
+    '''
+    Times calculate_window_sd and calculate_window_energy on a random signal for several window
+    sizes (step = window / 4, as in config). The energy detector computes every sample with FFT
+    convolution, so its time should stay flat as the window grows
+
+    Args:
+        n (int): number of samples (360000 = 30 min at 200 Hz)
+        window_sizes (tuple[int, ...]): window sizes to time
+    '''
+    from attempt_detection_helper import calculate_moving_energy, calculate_window_energy, calculate_window_sd
+
+    signal = np.random.default_rng(0).standard_normal(n)
+    calculate_moving_energy(signal, window_sizes[0])  # imports scipy.signal outside of the timing
+
+    for window_size in window_sizes:
+        step_size: int = window_size // 4
+        start: float = time.perf_counter()
+        sd_list: list = calculate_window_sd(signal, window_size, step_size)
+        sd_ms: float = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        energy_list: list = calculate_window_energy(signal, window_size, step_size)
+        energy_ms: float = (time.perf_counter() - start) * 1000
+        error: float = float(np.max(np.abs(np.array(sd_list) - np.array(energy_list))))
+        print(f'window {window_size}: sd {sd_ms:.1f} ms ({len(sd_list)} windows), energy {energy_ms:.1f} ms (every sample), max difference {error:.2e}')
+
+def benchmark_kernel(n: int = 2_000_000, block: int = config.STREAM_BLOCK_SAMPLES) -> None:
+    '''
+    Throughput (samples/s) of the streaming Z-axis path, fed in blocks of 'block' samples:
+    the kernel without Numba (separate passes: sosfilt, jerk diff, window SD of the buffered jerk)
+    and, if installed, the fused kernel compiled with Numba (compilation not timed)
+
+    Args:
+        n (int): number of samples
+        block (int): samples per block (as read from a stream)
+    '''
+    import kernel_helper
+
+    from scipy.signal import butter
+
+    rng = np.random.default_rng(0)
+    time_ns = np.arange(n, dtype = np.int64) * int(1e9 / config.FS)
+    acc_z = 9.81 + rng.standard_normal(n)
+    sos = butter(config.BUTTERWORTH_ORDER, config.BUTTERWORTH_CUTOFF / (0.5 * config.FS), btype = 'lowpass', output = 'sos')
+
+    def run_kernel() -> None:
+        kernel = kernel_helper.ZAxisKernel(sos)
+        for start in range(0, n, block):
+            kernel.process(time_ns[start : start + block], acc_z[start : start + block])
+            kernel.get_window_sd()
+
+    numba: bool = config.KERNEL_NUMBA
+    runs: list[str] = ['separate passes (NumPy)']
+    try:
+        config.KERNEL_NUMBA = True
+        kernel_helper._compiled_loop = None
+        if kernel_helper.get_compiled_loop() is not None:
+            kernel_helper.ZAxisKernel(sos).process(time_ns[:block], acc_z[:block])  # compiles it
+            runs.append('fused (Numba)')
+        else:
+            print('kernel: Numba is not installed, only the NumPy kernel is timed')
+
+        for name in runs:
+            config.KERNEL_NUMBA = name == 'fused (Numba)'
+            kernel_helper._compiled_loop = None
+            kernel_helper.get_compiled_loop()
+            start: float = time.perf_counter()
+            run_kernel()
+            print(f'kernel {name}: {n / (time.perf_counter() - start) / 1e6:.1f} M samples/s')
+    finally:
+        config.KERNEL_NUMBA = numba
+        kernel_helper._compiled_loop = None
+
+def get_roi_mask(roi_indexes: list[list[int]], n: int) -> np.ndarray:
+    '''
+    Samples covered by a list of ROIs (get_indexes)
+    '''
+    mask = np.zeros(n, dtype = bool)
+    for start, end in roi_indexes:
+        mask[start : end + 1] = True
+
+    return mask
+
+def report_detector_agreement(cases: list[str]) -> None:
+    '''
+    Runs the pipeline on every case with the SD and with the energy detector and prints the number
+    of attempts found by each and the overlap of their ROIs (samples in both / samples in either)
+
+    Args:
+        cases (list[str]): case numbers (file_names) without extension
+    '''
+    from pipeline_helper import detect_attempts, run_case
+
+    detector: str = config.DETECTOR
+    overlaps: list[float] = []
+    same_attempts: int = 0
+    try:
+        for case in cases:
+            analyses: dict = {}
+            for name in ['sd', 'energy']:
+                config.DETECTOR = name
+                result: dict | None = run_case(case)
+                if result is None:
+                    break
+                analyses[name] = detect_attempts(result)
+            if len(analyses) < 2:
+                print(f'{case}: skipped (case could not be read or was rejected)')
+                continue
+
+            n: int = analyses['sd']['df_filtered'].index.max() + 1
+            sd_mask = get_roi_mask(analyses['sd']['roi_indexes'], n)
+            energy_mask = get_roi_mask(analyses['energy']['roi_indexes'], n)
+            union: int = int(np.count_nonzero(sd_mask | energy_mask))
+            overlap: float = np.count_nonzero(sd_mask & energy_mask) / union if union else 1.0
+            overlaps.append(overlap)
+            attempts: tuple[int, int] = (analyses['sd']['number_failed_attempts'], analyses['energy']['number_failed_attempts'])
+            same_attempts += attempts[0] == attempts[1]
+            print(f'{case}: failed attempts sd {attempts[0]}, energy {attempts[1]}, ROI overlap {overlap:.2f}')
+    finally:
+        config.DETECTOR = detector
+
+    if overlaps:
+        print(f'detector agreement: same number of attempts in {same_attempts}/{len(overlaps)} cases, mean ROI overlap {np.mean(overlaps):.2f}')
+
+def main() -> None:
+
+    from cohort_helper import get_cases
+
+    parser = argparse.ArgumentParser(description = 'Performance budgets and detector comparison')
+    parser.add_argument('cases', nargs = '*', help = 'case numbers (file names without .csv) or folders for the detector agreement report')
+    args = parser.parse_args()
+
+    results: dict[str, bool] = {
+        'import_time': check_import_budget(),
+        'timestamp_glitch': check_timestamp_glitch(),
+    }
+
+    benchmark_detectors()
+    benchmark_kernel()
+    if args.cases:
+        report_detector_agreement(get_cases(args.cases))
+
+    for name, passed in results.items():
+        print(f'{name}: {"PASS" if passed else "FAIL"}')
+
+    if not all(results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,159 @@
+# Recovery Score Calculations: Cache helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: on-disk memoization of the pipeline stages (see pipeline_helper.py).
+# The key of a stage output is a hash of the key of its input, of the config values that the
+# stage reads and of the version of the stage's code, so changing a setting only recomputes the
+# stages that use it and the ones after them. Stage versions are kept in
+# pipeline_helper.STAGE_VERSIONS and must be bumped when a stage (or a function it calls) changes.
+# Outputs are pickled into config.CACHE_DIR. Every hit refreshes the file's modification time and
+# the least recently used files are deleted when the folder grows above config.CACHE_MAX_BYTES.
+# The numpy arrays of an output (DataFrame columns, jerk, SD series) are written out-of-band
+# (pickle protocol 5) after the pickle stream, aligned, and loaded as copy-on-write views of a
+# memory map of the file. A hit costs no parsing or copying, and the worker processes of a batch
+# that load the same stage share its pages through the page cache instead of pickling arrays.
+
+import hashlib
+import os
+import pickle
+
+from typing import Any, Callable
+
+import numpy as np
+
+import config
+
+ALIGNMENT: int = 64  # byte alignment of the arrays in a cache file
+
+def get_key(*parts) -> str:
+    '''
+    Hashes the parts of a cache key (stage name, input key, settings)
+
+    Returns:
+        str: hex digest
+    '''
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+def get_file_key(file_path: str) -> str:
+    '''
+    Key of a source file: its absolute path, size and modification time
+
+    Args:
+        file_path (str): path of the file
+
+    Returns:
+        str: hex digest
+    '''
+    stat = os.stat(file_path)
+
+    return get_key('file', os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+def memoize(stage: str, input_key: str, settings: dict, compute: Callable[[], Any], version: int = 1) -> tuple[Any, str]:
+    '''
+    Returns the cached output of a stage, or computes and caches it
+
+    Args:
+        stage (str): name of the stage
+        input_key (str): key of the stage input (key returned by the previous stage)
+        settings (dict): config values (and other parameters) read by the stage
+        compute (Callable[[], Any]): computes the output on a cache miss
+        version (int): version of the stage's code; outputs cached by other versions are not used
+
+    Returns:
+        tuple[Any, str]: the output and its key, to be passed to the next stage
+    '''
+    key: str = get_key(stage, version, input_key, sorted(settings.items()))
+    if not config.CACHE_ENABLED:
+        return compute(), key
+
+    cache_path: str = os.path.join(config.CACHE_DIR, f'{stage}_{key}.cache')
+    try:
+        value: Any = read_entry(cache_path)
+        os.utime(cache_path)  # most recently used
+        print(f'{stage}: loaded from cache')
+        return value, key
+
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        pass
+
+    value = compute()
+    try:
+        os.makedirs(config.CACHE_DIR, exist_ok = True)
+        # Written under a temporary name so an interrupted run never leaves a partial file
+        temporary_path: str = f'{cache_path}.{os.getpid()}.tmp'
+        write_entry(temporary_path, value)
+        os.replace(temporary_path, cache_path)
+        evict(config.CACHE_DIR, config.CACHE_MAX_BYTES)
+
+    except OSError as e:
+        print('Stage output could not be cached:', str(e))
+
+    return value, key
+
+def write_entry(file_path: str, value: Any) -> None:
+    '''
+    Writes a stage output as: header (pickle size, number of arrays, offset and size of each
+    array), pickle stream, arrays at ALIGNMENT byte offsets
+
+    Args:
+        file_path (str): cache file
+        value (Any): stage output
+    '''
+    buffers: list[pickle.PickleBuffer] = []
+    data: bytes = pickle.dumps(value, protocol = 5, buffer_callback = buffers.append)
+    raw: list[memoryview] = [buffer.raw() for buffer in buffers]
+
+    offsets: list[int] = []
+    position: int = 8 * (2 + 2 * len(raw)) + len(data)
+    for array in raw:
+        position = -(-position // ALIGNMENT) * ALIGNMENT
+        offsets.append(position)
+        position += array.nbytes
+    header = np.array([len(data), len(raw), *(n for offset, array in zip(offsets, raw) for n in (offset, array.nbytes))], dtype = '<u8')
+
+    with open(file_path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(data)
+        for offset, array in zip(offsets, raw):
+            f.write(bytes(offset - f.tell()))
+            f.write(array)
+
+def read_entry(file_path: str) -> Any:
+    '''
+    Loads a file written by write_entry. Its arrays are copy-on-write views of a memory map of the
+    file: they can be modified without changing the file, and stay valid if the file is evicted
+
+    Args:
+        file_path (str): cache file
+
+    Returns:
+        Any: stage output
+    '''
+    mapped = np.memmap(file_path, dtype = np.uint8, mode = 'c')
+    data_size, count = (int(n) for n in mapped[:16].view('<u8'))
+    table = mapped[16 : 16 + 16 * count].view('<u8').reshape(count, 2)
+    start: int = 16 + 16 * count
+    if start + data_size > len(mapped) or any(int(offset) + int(size) > len(mapped) for offset, size in table):
+        raise ValueError(f'Truncated cache file {file_path}')
+
+    return pickle.loads(mapped[start : start + data_size], buffers = [mapped[int(offset) : int(offset) + int(size)] for offset, size in table])
+
+def evict(cache_dir: str, max_bytes: int) -> None:
+    '''
+    Deletes the least recently used cache files until the folder is below 'max_bytes'
+
+    Args:
+        cache_dir (str): cache folder
+        max_bytes (int): size limit
+    '''
+    entries = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith('.cache')), key = lambda entry: entry.stat().st_mtime_ns)
+    total: int = sum(entry.stat().st_size for entry in entries)
+
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        try:
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+        except OSError:
+            pass
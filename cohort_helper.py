@@ -0,0 +1,180 @@
+# Recovery Score Calculations: Cohort helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: cohort-wide jerk threshold calibration (map-reduce).
+# Each worker process analyses one case at a time and returns only mergeable summaries of its jerk
+# (count, mean, M2 and a quantile sketch) plus its window SD list. The main process merges them
+# as they arrive into population statistics, so memory does not grow with the size of the archive.
+# The population threshold uses the same rule as set_jerk_threshold.
+# Usage: python cohort_helper.py <case numbers or folders> [--workers N] [--output file.csv]
+
+import argparse
+import csv
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
+
+import config
+
+from attempt_detection_helper import detect_roi_sd, get_attempts, set_jerk_threshold
+from stats_helper import QuantileSketch, RunningStats
+
+def get_cases(paths: list[str]) -> list[str]:
+    '''
+    Expands folders into the case numbers of the csv files they contain
+
+    Args:
+        paths (list[str]): case numbers (without .csv) or folders
+
+    Returns:
+        list[str]: case numbers, with their folder
+    '''
+    cases: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            cases.extend(sorted(os.path.join(path, name[:-len('.csv')]) for name in os.listdir(path) if name.endswith('.csv')))
+        else:
+            cases.append(path)
+
+    return cases
+
+def summarize_case(file_path: str, profiler: str | None = None) -> dict:
+    '''
+    Map step: analyses one case and summarizes its jerk
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        profiler (str | None): profile the case with this profiler (see profile_helper.py)
+
+    Returns:
+        dict: 'case', 'stats' (RunningStats), 'sketch' (QuantileSketch), 'sd_list', the case's own
+            'mean_jerk', 'std_jerk' and 'jerk_threshold_cal' (set_jerk_threshold), or 'error'
+    '''
+    from pipeline_helper import run_case
+
+    if profiler:
+        from profile_helper import profile_case
+
+    try:
+        with profile_case(file_path, profiler) if profiler else nullcontext():
+            result: dict | None = run_case(file_path)
+    except (OSError, ValueError) as e:
+        return {'case': file_path, 'error': str(e)}
+
+    if result is None or len(result['jerk']) == 0:
+        return {'case': file_path, 'error': 'case could not be read or was rejected'}
+
+    # The jerk for the SD detector (see pipeline_helper.get_detector_signal)
+    jerk = result['detector_signal']
+    stats = RunningStats()
+    stats.update(jerk)
+    sketch = QuantileSketch()
+    sketch.update(jerk)
+    mean_jerk, std_jerk, jerk_threshold_cal = set_jerk_threshold(jerk, config.FACTOR, config.PERCENTILE)
+
+    return {
+        'case': file_path,
+        'stats': stats,
+        'sketch': sketch,
+        'sd_list': result['sd_list'],
+        'mean_jerk': float(mean_jerk),
+        'std_jerk': float(std_jerk),
+        'jerk_threshold_cal': float(jerk_threshold_cal),
+    }
+
+def calibrate_cohort(cases: list[str], workers: int = config.COHORT_WORKERS, profiler: str | None = None) -> tuple[dict, list[dict]]:
+    '''
+    Runs summarize_case over all the cases in a process pool and merges the summaries (reduce step)
+
+    Args:
+        cases (list[str]): case numbers (file_names) without extension
+        workers (int): number of worker processes
+        profiler (str | None): profile every case with this profiler (see profile_helper.py)
+
+    Returns:
+        tuple[dict, list[dict]]: population statistics and threshold, and one row per case with its
+            own threshold, the z-scores of its mean jerk and threshold against those of the other
+            cases and its number of failed attempts with its own and with the population threshold
+    '''
+    population_stats = RunningStats()
+    population_sketch = QuantileSketch()
+    # Distributions across cases (one value per case) for the z-scores of the rows
+    case_means = RunningStats()
+    case_thresholds = RunningStats()
+    summaries: list[dict] = []
+
+    # Workers are restarted after COHORT_TASKS_PER_CHILD cases so memory can not build up
+    with ProcessPoolExecutor(max_workers = workers, max_tasks_per_child = config.COHORT_TASKS_PER_CHILD) as executor:
+        for summary in executor.map(summarize_case, cases, repeat(profiler)):
+            if 'error' in summary:
+                print(f"{summary['case']}: skipped ({summary['error']})")
+                continue
+
+            population_stats.merge(summary.pop('stats'))
+            population_sketch.merge(summary.pop('sketch'))
+            case_means.update([summary['mean_jerk']])
+            case_thresholds.update([summary['jerk_threshold_cal']])
+            summaries.append(summary)
+            print(f"{summary['case']}: summarized")
+
+    population_threshold: float = max(
+        population_stats.mean + config.FACTOR * population_stats.std,
+        population_sketch.percentile(config.PERCENTILE),
+    )
+    population: dict = {
+        'cases': len(summaries),
+        'samples': population_stats.count,
+        'mean_jerk': population_stats.mean,
+        'std_jerk': population_stats.std,
+        'percentile_jerk': population_sketch.percentile(config.PERCENTILE),
+        'jerk_threshold_cohort': population_threshold,
+    }
+
+    rows: list[dict] = []
+    for summary in summaries:
+        rows.append({
+            'Case_Number': summary['case'],
+            'mean_jerk': summary['mean_jerk'],
+            'std_jerk': summary['std_jerk'],
+            'jerk_threshold_cal': summary['jerk_threshold_cal'],
+            'z_mean_jerk': (summary['mean_jerk'] - case_means.mean) / case_means.std if case_means.std else 0.0,
+            'z_jerk_threshold_cal': (summary['jerk_threshold_cal'] - case_thresholds.mean) / case_thresholds.std if case_thresholds.std else 0.0,
+            'attempts_case_threshold': get_attempts(detect_roi_sd(summary['sd_list'], summary['jerk_threshold_cal'])),
+            'attempts_cohort_threshold': get_attempts(detect_roi_sd(summary['sd_list'], population_threshold)),
+        })
+
+    return population, rows
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description = 'Cohort-wide jerk threshold calibration')
+    parser.add_argument('cases', nargs = '+', help = 'case numbers (file names without .csv) or folders with case csv files')
+    parser.add_argument('--workers', type = int, default = config.COHORT_WORKERS, help = 'worker processes')
+    parser.add_argument('--output', default = config.COHORT_OUTPUT, help = 'csv file for the per-case results')
+    parser.add_argument('--profile', action = 'store_true', help = f'profile every case into {config.PROFILE_OUTPUT}/')
+    parser.add_argument('--profiler', default = config.PROFILER, choices = ['cprofile', 'sampling'], help = f'profiler used by --profile (default: {config.PROFILER})')
+    args = parser.parse_args()
+
+    cases: list[str] = get_cases(args.cases)
+    population, rows = calibrate_cohort(cases, args.workers, args.profiler if args.profile else None)
+
+    print('population:')
+    for key, value in population.items():
+        print(f'{key}: {value}')
+
+    if rows:
+        with open(args.output, 'w', newline = '') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames = list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f'per-case results saved to {args.output}')
+
+    if args.profile:
+        from profile_helper import print_summary
+        print_summary(cases, args.profiler)
+
+if __name__ == "__main__":
+
+    main()
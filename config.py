@@ -1,7 +1,7 @@
 # Config script
 # This script contains the configuration settings for the analysis of accelerometer data.
 # Script created on 5/19/2025
-# Last revision: 5/26/2025
+# Last revision: 10/19/2026
 
 # acceleration threshold value to signal sternal recumbency for initial filter
 TARGET_VALUE: float = 9.0 
@@ -17,7 +17,7 @@ FS: int = 200  # Sampling frequency (Hz)
 # variables for Derivative
 FACTOR: float = 3.0   # Adjusted factor to set jerk threshold
 PERCENTILE: float = 85.0    # Adjusted percentile to set jerk threshold
-JERK_THRESHOLD: float = 4.0e-08 #4.64e-07  # Threshold for significant jerk
+JERK_THRESHOLD: float = 40.0 #464.0  # Threshold for significant jerk (m/s^3)
 
 # variables for ROI_SD method
 # values can be changed  to increase/ decrease sensitivity
@@ -26,5 +26,88 @@ WINDOW_SIZE: int = 4000 # each cell is 5ms, 10000 cells represent 2secs, 2500 ce
 STEP_SIZE: int = int(WINDOW_SIZE / 4) # 2000 cells are 400ms (0.4secs), 833 cells are 166.6ms (0.166secs). longer events 2000
 #THRESHOLD: float = 0.0 # default value for SD threshold 1.5 (1.5e-08)
 
-YMAX: float = 6e-08  # limit for vlines
-YMIN: float = -6e-08  # limits for vlines
\ No newline at end of file
+YMAX: float = 60.0  # limit for vlines (m/s^3)
+YMIN: float = -60.0  # limits for vlines (m/s^3)
+
+# variables for plotting and startup
+PLOT: bool = True  # draw graphs by default. 'python main.py <case> --no-plot' overrides it
+IMPORT_TIME_BUDGET_MS: float = 1000.0  # max cumulative import time of main.py (python -X importtime)
+
+# variables for stream ingest (stream_helper.py)
+STREAM_BLOCK_SAMPLES: int = 2000  # lines parsed and processed together (10 secs at 200 Hz)
+STREAM_POLL_INTERVAL: float = 0.5  # secs between reads of a followed file that has no new data
+STREAM_IDLE_TIMEOUT: float = 30.0  # secs without new data after which a followed file is considered complete
+STREAM_WORKERS: int = 4  # threads processing the blocks of all streams
+
+# variables for binary recordings (recording_helper.py)
+RECORDING_EXTENSION: str = '.rsb'  # binary recording of a case, read instead of the csv when it exists
+RECORDING_CHUNK_SAMPLES: int = 65536  # samples per chunk (about 5.5 mins at 200 Hz)
+RECORDING_AXIS_ENCODING: str = 'float32'  # 'float32' or 'int16' (scaled per chunk)
+RECORDING_COMPRESS: bool = True  # zlib compress each chunk
+RECORDING_COMPRESSION_LEVEL: int = 6
+
+# variables for the sidecar index (index_helper.py)
+INDEX_EXTENSION: str = '.idx.npz'  # sidecar index of a case csv
+INDEX_STRIDE: int = 2000  # samples between indexed lines (10 secs at 200 Hz)
+BUTTERWORTH_WARMUP: int = 2000  # samples filtered on each side of a loaded range and then dropped
+
+# variables for the min/max pyramid used to plot long recordings (pyramid_helper.py)
+PYRAMID_EXTENSION: str = '.pyr.npz'  # stored as <case>_accel.pyr.npz and <case>_jerk.pyr.npz
+PYRAMID_FACTOR: int = 8  # samples per bucket between two levels
+PYRAMID_MAX_POINTS: int = 4000  # max buckets drawn per line for the visible range
+PYRAMID_MIN_SAMPLES: int = 100000  # shorter signals are plotted directly
+
+# variables for the timestamp check done right after reading (timestamp_helper.py)
+TIMESTAMP_POLICY: str = 'average'  # 'reject', 'drop', 'average' (duplicates) or 'resample' (onto a uniform FS grid)
+TIMESTAMP_GAP_FACTOR: float = 2.0  # an interval longer than this many sampling periods counts as a gap
+TIMESTAMP_TOLERANCE: float = 0.01  # max relative deviation from 1/FS for the sampling to count as uniform
+TIMESTAMP_OUTLIER_PASSES: int = 16  # passes dropping isolated out-of-order samples before the longest in-order run is kept
+TIMESTAMP_MIN_KEPT: float = 0.9  # a case is rejected if fewer than this fraction of its samples are in order
+
+# variables for the jerk fast path (derivative_helper.calculate_derivatives_uniform)
+JERK_FAST_PATH: bool = True  # use the fast path when validate_timestamps reports uniform sampling at FS
+JERK_SMOOTHING: str | None = None  # None or 'savgol' (Savitzky-Golay derivative, fast path only)
+SAVGOL_WINDOW: int = 21  # samples in the Savitzky-Golay window (odd)
+SAVGOL_POLYORDER: int = 3  # order of the Savitzky-Golay polynomial
+
+# variables for the optional decimation after the Butterworth filter (file_helper.apply_decimation)
+DECIMATION_FACTOR: int = 1  # 1 disables it. 0.5 * FS / DECIMATION_FACTOR must stay above BUTTERWORTH_CUTOFF (e.g. 10 -> 10 Hz Nyquist) and WINDOW_SIZE, STEP_SIZE must be multiples of it
+
+# variables for the cohort threshold calibration (cohort_helper.py)
+COHORT_WORKERS: int = 4  # worker processes
+COHORT_TASKS_PER_CHILD: int = 20  # cases processed by a worker before it is replaced
+COHORT_OUTPUT: str = 'cohort_calibration.csv'  # per-case results
+
+# variables for the on-disk cache of the pipeline stages (cache_helper.py)
+CACHE_ENABLED: bool = True  # False recomputes every stage
+CACHE_DIR: str = '.rs_cache'  # folder of the cached stage outputs
+CACHE_MAX_BYTES: int = 2 * 1024**3  # least recently used outputs are deleted above this size
+
+# variables for the ROI dataset export (export_helper.py)
+EXPORT_WORKERS: int = 4  # worker processes
+
+# variables for the choice of attempt detector (pipeline_helper.py)
+# 'sd': window SD of the jerk (calculate_window_sd)
+# 'energy': short-time energy of the acceleration magnitude, FFT convolution (calculate_window_energy)
+# The threshold (FACTOR, PERCENTILE) is set on the signal of the detector
+DETECTOR: str = 'sd'
+
+# variables for the summaries of the results file (analytics_helper.py)
+ANALYTICS_CHUNK_ROWS: int = 100000  # rows of RS_output.csv read at a time
+ANALYTICS_OUTPUT: str = 'RS_summary'  # folder for the summary tables
+
+# variables for the optional profiling of the runs (profile_helper.py, '--profile')
+PROFILER: str = 'cprofile'  # profiler used by '--profile' unless '--profiler NAME' selects another: 'cprofile' (.prof) or 'sampling' (collapsed stacks)
+PROFILE_OUTPUT: str = 'profiles'  # folder for the profile of every case
+PROFILE_INTERVAL: float = 0.005  # seconds between two samples of the sampling profiler
+PROFILE_TOP: int = 20  # functions listed in the batch summary
+
+# variables for the fused Z-axis kernel of the streaming analysis (kernel_helper.py)
+KERNEL_NUMBA: bool = True  # compile the kernel with Numba when it is installed (NumPy otherwise)
+
+# variables for the upload folder watcher (watch_helper.py)
+WATCH_POLL_INTERVAL: float = 2.0  # seconds between two checks of the folder
+WATCH_SETTLE_TIME: float = 30.0  # seconds without growth after which a case is scored
+WATCH_READ_BYTES: int = 4 * 1024**2  # bytes read (and checkpointed) at a time
+WATCH_CHECKPOINT_DIR: str = '.rs_watch'  # folder for the per-file checkpoints
+WATCH_HEAD_BYTES: int = 4096  # first bytes of a file hashed to detect that it was replaced
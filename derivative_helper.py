@@ -1,9 +1,12 @@
 # Recovery Score Calculations: Derivative helper
 # Script created  11/7/2024
-# Last revision 5/31/2024
+# Last revision 10/19/2026
+# Notes: jerk is returned in m/s^3 (timestamps are converted from ns to seconds)
 
 import numpy as np
 
+import config
+
 from numpy.typing import NDArray
 from typing import Tuple
 
@@ -21,8 +24,8 @@ def calculate_derivatives(df) -> NDArray[np.float64]:
     acc_z_np, time_stamp_np = convert_to_np(df)
     print('Data converted to numpy array successfully')
     
-    # Calculates time differences
-    dt: NDArray[np.float64] = np.diff(time_stamp_np)  
+    # Calculates time differences (ns to s)
+    dt: NDArray[np.float64] = np.diff(time_stamp_np) * 1e-9
     
     # Handles potential division by zero in dt
     if np.any(dt <= 0):
@@ -40,6 +43,40 @@ def calculate_derivatives(df) -> NDArray[np.float64]:
 
     return jerk
 
+def calculate_derivatives_uniform(acc_z: NDArray[np.float64], fs: float, smoothing: str | None = None) -> NDArray[np.float64]:
+    '''
+    Fast path of calculate_derivatives for signals sampled uniformly at 'fs' (see validate_timestamps).
+    The jerk is the difference between consecutive samples times fs, written into a single
+    output array, so no timestamp is read and no division is done per sample
+
+    Args:
+        acc_z (NDArray[np.float64]): Acc_Z values (e.g. the Butterworth filter output)
+        fs (float): sampling frequency (Hz)
+        smoothing (str | None): None for the plain difference, 'savgol' for a Savitzky-Golay
+            derivative (config.SAVGOL_WINDOW, config.SAVGOL_POLYORDER)
+
+    Returns:
+        NDArray[np.float64]: jerk in m/s^3, one value less than acc_z (same length as calculate_derivatives)
+    '''
+    acc_z = np.asarray(acc_z, dtype = np.float64)
+    if len(acc_z) < 2:
+        return np.array([], dtype = np.float64)
+
+    if smoothing == 'savgol':
+        from scipy.signal import savgol_filter
+
+        # Derivative of the local polynomial fit at each sample; the last one is dropped to keep the length
+        return savgol_filter(acc_z, config.SAVGOL_WINDOW, config.SAVGOL_POLYORDER, deriv = 1, delta = 1 / fs)[:-1]
+
+    if smoothing is not None:
+        raise ValueError(f'Unknown jerk smoothing {smoothing!r}')
+
+    jerk: NDArray[np.float64] = np.empty(len(acc_z) - 1)
+    np.subtract(acc_z[1:], acc_z[:-1], out = jerk)
+    jerk *= fs
+
+    return jerk
+
 def convert_to_np(df) -> Tuple:
     '''
     Converts pandas DataFrame to a tuple of NumPy arrays
@@ -51,7 +88,9 @@ def convert_to_np(df) -> Tuple:
     '''
     # Converts Acc_Z and time_stamp to numpy arrays
     acc_z_np: NDArray = np.array(df['Acc_Z'], dtype=np.float64)
-    time_stamp_np: NDArray = np.array(df['timeStamp'], dtype=np.float64)
+    # Timestamps in ns relative to the first sample, so they are exact in float64
+    time_stamp_ns: NDArray = df['timeStamp'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    time_stamp_np: NDArray = (time_stamp_ns - time_stamp_ns[:1]).astype(np.float64)
           
     return acc_z_np, time_stamp_np
 
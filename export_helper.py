@@ -0,0 +1,244 @@
+# Recovery Score Calculations: Export helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: exports the acceleration samples of every detected ROI (extract_accel_values_from_roi)
+# with their max accelerations and scores to a dataset folder for downstream modelling:
+#   samples.f32   Acc_X, Acc_Y, Acc_Z of all ROIs one after the other (float32, n x 3, ragged array)
+#   rois.csv      one row per ROI: case, ROI index, bounds, 'offset' and 'length' into samples.f32,
+#                 window SD, amax_* and the case scores
+# Cases are appended one at a time, so a whole cohort streams through with bounded memory, and
+# load_dataset memory-maps the samples so they can be used without parsing any csv.
+# With several workers, each worker analyses a case and returns its ROI samples (small next to the
+# stage arrays, which the workers map from the stage cache, see cache_helper.py); the main process
+# writes them in case order, with at most two cases per worker queued or waiting to be written.
+# Usage: python export_helper.py <dataset folder> <case numbers or folders> [--workers N]
+
+import argparse
+import csv
+import os
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from numpy.typing import NDArray
+
+SAMPLES_FILE: str = 'samples.f32'
+METADATA_FILE: str = 'rois.csv'
+METADATA_COLUMNS: list[str] = [
+    'Case_Number', 'roi_index', 'start', 'end', 'offset', 'length', 'start_time', 'end_time', 'sd',
+    'amax_x', 'amax_y', 'amax_z', 'jerk_threshold_cal', 'Number_failed_attempts', 'sa_2axes_py', 'sumua_py', 'rs_2axes_py',
+]
+
+def get_case_rows(case_number: str, analysis: dict) -> tuple[NDArray[np.float32], list[dict]]:
+    '''
+    Samples and metadata rows of the ROIs of one case
+
+    Args:
+        case_number (str): case number
+        analysis (dict): output of pipeline_helper.detect_attempts, or a dict with the same
+            'df_filtered', 'roi_sd', 'roi_indexes', 'extracted_roi', 'amax_*_list',
+            'jerk_threshold_cal', 'number_failed_attempts', 'sa_2axes', 'sumua', 'rs_2axes_py' keys
+
+    Returns:
+        tuple[NDArray[np.float32], list[dict]]: (n, 3) samples of all the ROIs one after the other
+            and one row per ROI, with its 'offset' relative to the first ROI of the case
+    '''
+    time_stamps: pd.Series = analysis['df_filtered']['timeStamp']
+    samples: list[NDArray[np.float32]] = []
+    rows: list[dict] = []
+    offset: int = 0
+
+    for i, (start, end) in enumerate(analysis['roi_indexes']):
+        samples.append(analysis['extracted_roi'][i][['Acc_X', 'Acc_Y', 'Acc_Z']].to_numpy(dtype = '<f4'))
+        rows.append({
+            'Case_Number': case_number,
+            'roi_index': i,
+            'start': start,
+            'end': end,
+            'offset': offset,
+            'length': len(samples[-1]),
+            'start_time': time_stamps.loc[start],
+            'end_time': time_stamps.loc[end],
+            'sd': analysis['roi_sd'][i][1],
+            'amax_x': analysis['amax_x_list'][i],
+            'amax_y': analysis['amax_y_list'][i],
+            'amax_z': analysis['amax_z_list'][i],
+            'jerk_threshold_cal': analysis['jerk_threshold_cal'],
+            'Number_failed_attempts': analysis['number_failed_attempts'],
+            'sa_2axes_py': analysis['sa_2axes'],
+            'sumua_py': analysis['sumua'],
+            'rs_2axes_py': analysis['rs_2axes_py'],
+        })
+        offset += len(samples[-1])
+
+    return (np.concatenate(samples) if samples else np.empty((0, 3), dtype = '<f4')), rows
+
+def write_rows(dataset_path: str, samples: NDArray[np.float32], rows: list[dict]) -> int:
+    '''
+    Appends the samples and rows returned by get_case_rows to the dataset (created if it does not exist)
+
+    Args:
+        dataset_path (str): dataset folder
+        samples (NDArray[np.float32]): (n, 3) samples
+        rows (list[dict]): metadata rows, offsets relative to the first row
+
+    Returns:
+        int: number of ROIs added
+    '''
+    os.makedirs(dataset_path, exist_ok = True)
+    samples_path: str = os.path.join(dataset_path, SAMPLES_FILE)
+    metadata_path: str = os.path.join(dataset_path, METADATA_FILE)
+
+    # Offsets continue from the rows already in the samples file
+    offset: int = os.path.getsize(samples_path) // (3 * 4) if os.path.exists(samples_path) else 0
+    new_metadata: bool = not os.path.exists(metadata_path)
+
+    with open(samples_path, 'ab') as samples_file, open(metadata_path, 'a', newline = '') as metadata_file:
+        writer = csv.DictWriter(metadata_file, fieldnames = METADATA_COLUMNS)
+        if new_metadata:
+            writer.writeheader()
+
+        # A case without ROIs writes no samples
+        if len(samples):
+            samples_file.write(np.ascontiguousarray(samples, dtype = '<f4').tobytes())
+        writer.writerows({**row, 'offset': offset + row['offset']} for row in rows)
+
+    return len(rows)
+
+def append_case(dataset_path: str, case_number: str, analysis: dict) -> int:
+    '''
+    Appends the ROIs of one case to the dataset (created if it does not exist)
+
+    Args:
+        dataset_path (str): dataset folder
+        case_number (str): case number
+        analysis (dict): see get_case_rows
+
+    Returns:
+        int: number of ROIs added
+    '''
+    return write_rows(dataset_path, *get_case_rows(case_number, analysis))
+
+def load_dataset(dataset_path: str) -> tuple[NDArray[np.float32], pd.DataFrame]:
+    '''
+    Opens a dataset written by append_case
+
+    Args:
+        dataset_path (str): dataset folder
+
+    Returns:
+        tuple[NDArray[np.float32], pd.DataFrame]: memory-mapped (n, 3) samples of all ROIs and the
+            metadata table. ROI i is samples[offset[i] : offset[i] + length[i]] (see get_roi_samples)
+    '''
+    samples: NDArray[np.float32] = np.memmap(os.path.join(dataset_path, SAMPLES_FILE), dtype = '<f4', mode = 'r').reshape(-1, 3)
+    metadata: pd.DataFrame = pd.read_csv(os.path.join(dataset_path, METADATA_FILE))
+
+    return samples, metadata
+
+def get_roi_samples(samples: NDArray[np.float32], metadata: pd.DataFrame, row: int) -> NDArray[np.float32]:
+    '''
+    Samples (Acc_X, Acc_Y, Acc_Z) of one ROI of a dataset, without copying them
+
+    Args:
+        samples (NDArray[np.float32]): samples returned by load_dataset
+        metadata (pd.DataFrame): metadata returned by load_dataset
+        row (int): row of the metadata table
+
+    Returns:
+        NDArray[np.float32]: (length, 3) view of the samples
+    '''
+    offset: int = int(metadata['offset'].iloc[row])
+
+    return samples[offset : offset + int(metadata['length'].iloc[row])]
+
+def analyse_case(file_path: str, profiler: str | None = None) -> dict:
+    '''
+    Worker step of export_cases: analyses one case and returns its ROIs
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        profiler (str | None): profile the case with this profiler (see profile_helper.py)
+
+    Returns:
+        dict: 'case', 'rows' and 'samples' (get_case_rows), or 'error'
+    '''
+    from pipeline_helper import detect_attempts, run_case
+
+    if profiler:
+        from profile_helper import profile_case
+
+    with profile_case(file_path, profiler) if profiler else nullcontext():
+        result: dict | None = run_case(file_path)
+        if result is None:
+            return {'case': file_path, 'error': 'case could not be read or was rejected'}
+
+        samples, rows = get_case_rows(os.path.basename(file_path), detect_attempts(result))
+
+    return {'case': file_path, 'rows': rows, 'samples': samples}
+
+def export_cases(dataset_path: str, cases: list[str], workers: int = config.EXPORT_WORKERS, profiler: str | None = None) -> int:
+    '''
+    Analyses the cases and appends their ROIs to the dataset, in the order of 'cases'
+
+    Args:
+        dataset_path (str): dataset folder
+        cases (list[str]): case numbers (file_names) without extension
+        workers (int): worker processes. 1 analyses the cases one after the other in this process
+        profiler (str | None): profile every case with this profiler (see profile_helper.py)
+
+    Returns:
+        int: number of ROIs added
+    '''
+    def write(case_result: dict) -> int:
+        if 'error' in case_result:
+            print(f"{case_result['case']}: skipped ({case_result['error']})")
+            return 0
+        added: int = write_rows(dataset_path, case_result['samples'], case_result['rows'])
+        print(f"{case_result['case']}: {added} ROIs exported")
+        return added
+
+    if workers <= 1:
+        return sum(write(analyse_case(case, profiler)) for case in cases)
+
+    total: int = 0
+    with ProcessPoolExecutor(max_workers = workers, max_tasks_per_child = config.COHORT_TASKS_PER_CHILD) as executor:
+        # Submitted a few cases ahead only, so results that finish out of order do not pile up
+        pending: deque[Future] = deque()
+        for case in cases:
+            pending.append(executor.submit(analyse_case, case, profiler))
+            if len(pending) >= 2 * workers:
+                total += write(pending.popleft().result())
+        while pending:
+            total += write(pending.popleft().result())
+
+    return total
+
+def main() -> None:
+
+    from cohort_helper import get_cases
+
+    parser = argparse.ArgumentParser(description = 'Export the ROI samples of many cases to a dataset')
+    parser.add_argument('dataset', help = 'dataset folder (created or appended to)')
+    parser.add_argument('cases', nargs = '+', help = 'case numbers (file names without .csv) or folders with case csv files')
+    parser.add_argument('--workers', type = int, default = config.EXPORT_WORKERS, help = 'worker processes')
+    parser.add_argument('--profile', action = 'store_true', help = f'profile every case into {config.PROFILE_OUTPUT}/')
+    parser.add_argument('--profiler', default = config.PROFILER, choices = ['cprofile', 'sampling'], help = f'profiler used by --profile (default: {config.PROFILER})')
+    args = parser.parse_args()
+
+    cases: list[str] = get_cases(args.cases)
+    total: int = export_cases(args.dataset, cases, args.workers, args.profiler if args.profile else None)
+    print(f'{total} ROIs exported to {args.dataset}')
+
+    if args.profile:
+        from profile_helper import print_summary
+        print_summary(cases, args.profiler)
+
+if __name__ == "__main__":
+
+    main()
@@ -1,10 +1,10 @@
 # Recovery Score Calculations: file_helper Script
 # Script created  3/25/2024
-# Last revision 5/31/2025
+# Last revision 10/19/2026
 
+import os
 import pandas as pd
 import numpy as np
-from scipy.signal import butter, filtfilt
 
 def read_csv_file(file_path) -> pd.DataFrame:
     '''
@@ -48,6 +48,34 @@ def read_csv_file(file_path) -> pd.DataFrame:
         print('An error occurred:', str(e))
         
         return pd.DataFrame()
+
+def read_case_file(file_path) -> pd.DataFrame:
+    '''
+    Reads a case from its binary recording (see recording_helper.py) if one was converted and the
+    csv has not changed since, otherwise from the logger csv file with read_csv_file
+
+    Args:
+        file_path: case number (file_name) entered by user
+
+    Returns:
+        Pandas DataFrame with the timeStamp, Acc_X, Acc_Y and Acc_Z columns
+    '''
+    from recording_helper import add_recording_extension, has_recording, read_recording
+
+    if has_recording(file_path):
+        try:
+            print('reading binary recording...')
+            return read_recording(file_path)
+
+        except (OSError, ValueError) as e:
+            print('An error occurred:', str(e))
+
+            return pd.DataFrame()
+
+    if os.path.exists(add_recording_extension(file_path)):
+        print(f'{add_csv_extension(file_path)} changed since it was converted, the binary recording is not used')
+
+    return read_csv_file(file_path)
     
 def add_csv_extension(file_path: str) -> str:
     '''
@@ -80,8 +108,9 @@ def initial_filter(df, target_value) -> pd.DataFrame:
     
     try:
    
-        # Finds the index of the first occurrence of the target value in column 'Acc_Z'
-        start_index: int = df[df['Acc_Z'] > target_value].index[0]
+        # Finds the position of the first occurrence of the target value in column 'Acc_Z'
+        # (a DataFrame repaired by validate_timestamps is indexed by source sample numbers)
+        start_index: int = int(np.flatnonzero(df['Acc_Z'].to_numpy() > target_value)[0])
         
         # Create the new DataFrame starting from that index
         filtered_df = df.iloc[start_index:].reset_index(drop = True)
@@ -92,7 +121,7 @@ def initial_filter(df, target_value) -> pd.DataFrame:
         # If the target value is not found, return the same dataFrame
         print(f'No values in "Acc_Z" greater than {target_value} could be found. Returning the original DataFrame')
 
-        return df
+        return df.reset_index(drop = True)
     
 def apply_moving_average(df_filtered, target_moving_avg) -> pd.DataFrame:
     '''
@@ -147,13 +176,45 @@ def apply_butterworth_filter(df, order, cutoff, fs) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame with the filtered acceleration data.
     '''
+    # scipy.signal is imported here so that reading a file does not pay its import cost
+    from scipy.signal import butter, filtfilt
+
     nyquist = 0.5 * fs
     normal_cutoff = cutoff / nyquist
     b, a = butter(order, normal_cutoff, btype='lowpass', analog=False)
 
+    # Only the axes present in df are filtered (the tools that only need Acc_Z pass just that column)
     df_filtered = df.copy()
-    df_filtered['Acc_X'] = filtfilt(b, a, df['Acc_X'])
-    df_filtered['Acc_Y'] = filtfilt(b, a, df['Acc_Y'])
-    df_filtered['Acc_Z'] = filtfilt(b, a, df['Acc_Z'])
+    for column in ['Acc_X', 'Acc_Y', 'Acc_Z']:
+        if column in df.columns:
+            df_filtered[column] = filtfilt(b, a, df[column])
+
+    return df_filtered
+
+def apply_decimation(df, factor) -> pd.DataFrame:
+    '''
+    Reduces the sampling frequency of the acceleration data by 'factor' after an anti-aliasing
+    low-pass filter (scipy.signal.decimate, zero phase IIR). Every 'factor'-th timestamp is kept.
+    The IIR filter is applied with filtfilt, whose edge padding avoids the start/end transients
+    that the zero padded FIR version produces on a signal with a large offset (gravity on Acc_Z).
+    Intended for the Butterworth filtered signal, which has no content above BUTTERWORTH_CUTOFF,
+    so the new Nyquist frequency (0.5 * fs / factor) must stay above that cutoff
+
+    Args:
+        df (pd.DataFrame): DataFrame with timeStamp and any of the Acc_X, Acc_Y, Acc_Z columns
+        factor (int): decimation factor (1 returns the same DataFrame)
+
+    Returns:
+        pd.DataFrame: DataFrame with the decimated data
+    '''
+    if factor <= 1:
+        return df
+
+    from scipy.signal import decimate
+
+    df_decimated = pd.DataFrame({'timeStamp': df['timeStamp'].iloc[::factor].reset_index(drop = True)})
+    for column in ['Acc_X', 'Acc_Y', 'Acc_Z']:
+        if column in df.columns:
+            df_decimated[column] = decimate(df[column].to_numpy(dtype = np.float64), factor, ftype = 'iir', zero_phase = True)
 
-    return df_filtered
\ No newline at end of file
+    return df_decimated
@@ -1,6 +1,6 @@
 # Recovery Score Calculations: Graph_Helper Script
 # Script created  3/25/2024
-# Last revision 5/31/2025
+# Last revision 10/19/2026
 
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -9,6 +9,7 @@ import pandas as pd
 import config
 
 from numpy.typing import NDArray
+from pyramid_helper import get_pyramid, plot_pyramid
 
 def plot_acceleration_data(df_filtered: pd.DataFrame, df_moving_avg: pd.DataFrame, df_butterworth: pd.DataFrame) -> None:
     '''
@@ -117,7 +118,12 @@ def get_plot_jerk_with_roi(jerk:np.ndarray, df:pd.DataFrame, roi_sd:list, window
 
     plt.figure(figsize=(10, 6))
     
-    plt.plot(timeStamp_jerk, jerk, label="Jerk", color="blue")
+    # Long recordings are drawn from a min/max pyramid that follows zoom and pan
+    if len(jerk) > config.PYRAMID_MIN_SAMPLES:
+        pyramid = get_pyramid(file_path, 'jerk', timeStamp_jerk.astype('datetime64[ns]').astype(np.int64), {'jerk': jerk})
+        plot_pyramid(plt.gca(), pyramid, {'jerk': {'label': 'Jerk', 'color': 'blue'}})
+    else:
+        plt.plot(timeStamp_jerk, jerk, label="Jerk", color="blue")
     
     for k in range(len(roi_sd)):
         # Vertical lines for the start of the regions of interest
@@ -144,7 +150,7 @@ def get_plot_jerk_with_roi(jerk:np.ndarray, df:pd.DataFrame, roi_sd:list, window
     plt.legend()
     plt.show()
 
-def plot_accel_data_with_roi_and_maxaccel(df: pd.DataFrame, roi_indexes: list, amax_x: list, amax_y: list, amax_z: list) -> None:
+def plot_accel_data_with_roi_and_maxaccel(df: pd.DataFrame, roi_indexes: list, amax_x: list, amax_y: list, amax_z: list, file_path: str | None = None) -> None:
     '''
     Plots the acceleration data with ROI as Vlines and maximum accelerations in each ROI highlighted as dots.
 
@@ -153,14 +159,26 @@ def plot_accel_data_with_roi_and_maxaccel(df: pd.DataFrame, roi_indexes: list, a
         amax_x_list (list[float]): List of maximum accelerations in X axis.
         amax_y_list (list[float]): List of maximum accelerations in Y axis.
         amax_z_list (list[float]): List of maximum accelerations in Z axis.
+        file_path (str | None): case number, used to store the pyramid of long recordings next to it
     Returns:
         None
     '''
     plt.figure(figsize=(15, 10))
     # Plot AccX, AccY, and AccZ
-    plt.plot(df['timeStamp'], df['Acc_X'], label='Acc_X', color='blue')
-    plt.plot(df['timeStamp'], df['Acc_Y'], label='Acc_Y', color='green')
-    plt.plot(df['timeStamp'], df['Acc_Z'], label='Acc_Z', color='red')
+    # Long recordings are drawn from a min/max pyramid that follows zoom and pan
+    if len(df) > config.PYRAMID_MIN_SAMPLES:
+        time_ns: NDArray[np.int64] = df['timeStamp'].to_numpy(dtype = 'datetime64[ns]').astype(np.int64)
+        signals: dict = {axis: df[axis].to_numpy(dtype = np.float64) for axis in ['Acc_X', 'Acc_Y', 'Acc_Z']}
+        pyramid = get_pyramid(file_path, 'accel', time_ns, signals)
+        plot_pyramid(plt.gca(), pyramid, {
+            'Acc_X': {'label': 'Acc_X', 'color': 'blue'},
+            'Acc_Y': {'label': 'Acc_Y', 'color': 'green'},
+            'Acc_Z': {'label': 'Acc_Z', 'color': 'red'},
+        })
+    else:
+        plt.plot(df['timeStamp'], df['Acc_X'], label='Acc_X', color='blue')
+        plt.plot(df['timeStamp'], df['Acc_Y'], label='Acc_Y', color='green')
+        plt.plot(df['timeStamp'], df['Acc_Z'], label='Acc_Z', color='red')
 
     # Plot ROIs
     for i in range(len(roi_indexes)):
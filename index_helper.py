@@ -0,0 +1,451 @@
+# Recovery Score Calculations: Index helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: sidecar index (<case>.idx.npz) mapping sample numbers and timestamps to byte offsets in
+# the logger csv, so a time range or a single ROI can be loaded and filtered without reading the
+# whole recording. Binary recordings (recording_helper.py) are read through their own chunk index.
+# ROI indexes count the rows of the case after validate_timestamps. When it had to repair the
+# timestamps (or TIMESTAMP_POLICY is 'resample') the rows are no longer the csv samples, so ROIs
+# are taken from the repaired DataFrame (the cached read and timestamps stages of main.py) instead.
+# Usage: python index_helper.py <case number> --roi <start> <end> [--no-plot]
+#        (start and end as printed in 'roi_indexes' by main.py)
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from file_helper import add_csv_extension, apply_butterworth_filter
+from numpy.typing import NDArray
+
+SCAN_BLOCK_BYTES: int = 16 * 1024 * 1024  # bytes read at a time while looking for line starts
+
+def add_index_extension(file_path: str) -> str:
+    '''
+    adds the index extension (config.INDEX_EXTENSION) to the file number
+
+    Args:
+        file_path (str): Case Number
+
+    Returns:
+        str: the Case Number (entered) plus the index extension
+    '''
+    return file_path + config.INDEX_EXTENSION
+
+def find_initial_filter_start(file_path: str, target_value: float) -> int:
+    '''
+    Finds the first sample where Acc_Z is greater than 'target_value', as initial_filter does,
+    reading only the Acc_Z column and stopping as soon as it is found
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        target_value (float): see initial_filter
+
+    Returns:
+        int: sample number where the filtered DataFrame starts (0 if the value is never reached)
+    '''
+    reader = pd.read_csv(add_csv_extension(file_path), skiprows = 3, header = None, usecols = [3], dtype = float, chunksize = config.RECORDING_CHUNK_SAMPLES)
+    start: int = 0
+    for chunk in reader:
+        above: NDArray[np.intp] = np.flatnonzero(chunk[3].to_numpy() > target_value)
+        if len(above):
+            return start + int(above[0])
+        start += len(chunk)
+
+    return 0
+
+def timestamps_increasing(file_path: str) -> bool:
+    '''
+    Checks that the timestamps of the logger csv are strictly increasing, i.e. that
+    validate_timestamps has nothing to drop or merge
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        bool: True if every timestamp is later than the previous one
+    '''
+    last: int | None = None
+    reader = pd.read_csv(add_csv_extension(file_path), skiprows = 3, header = None, usecols = [0], dtype = str, chunksize = config.RECORDING_CHUNK_SAMPLES)
+    for chunk in reader:
+        time_ns: NDArray[np.int64] = pd.to_datetime(chunk[0]).to_numpy(dtype = 'datetime64[ns]').astype(np.int64)
+        if last is not None:
+            time_ns = np.concatenate(([last], time_ns))
+        if np.any(np.diff(time_ns) <= 0):
+            return False
+        last = int(time_ns[-1])
+
+    return True
+
+def build_index(file_path: str) -> dict:
+    '''
+    Scans the logger csv once and writes the sidecar index: the byte offset and timestamp of
+    every config.INDEX_STRIDE-th sample, the number of samples, the sample where the
+    initial filter starts and whether the timestamps are strictly increasing
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        dict: the index (see load_index)
+    '''
+    print('building index...')
+    file_path_csv: str = add_csv_extension(file_path)
+    line_starts: list[int] = []  # byte offsets of every INDEX_STRIDE-th data line
+    n_lines: int = 0  # newlines seen so far
+    ends_with_newline: bool = True
+
+    with open(file_path_csv, 'rb') as f:
+        base: int = 0
+        while block := f.read(SCAN_BLOCK_BYTES):
+            newlines: NDArray[np.intp] = np.flatnonzero(np.frombuffer(block, dtype = np.uint8) == ord('\n'))
+            # Data line r (0-based) is line r + 3 and starts right after newline number r + 2
+            line_numbers: NDArray[np.intp] = n_lines + np.arange(len(newlines)) - 2
+            selected: NDArray[np.bool_] = (line_numbers >= 0) & (line_numbers % config.INDEX_STRIDE == 0)
+            line_starts.extend((base + newlines[selected] + 1).tolist())
+            n_lines += len(newlines)
+            base += len(block)
+            ends_with_newline = block.endswith(b'\n')
+
+        n_samples: int = n_lines - 3 + (0 if ends_with_newline else 1)
+        # A newline at the very end of the file does not start a sample
+        line_starts = [offset for offset in line_starts if offset < base]
+
+        timestamps: list[str] = []
+        for offset in line_starts:
+            f.seek(offset)
+            timestamps.append(f.readline().split(b',', 1)[0].decode('utf-8'))
+
+    index: dict = {
+        'sample': np.arange(len(line_starts), dtype = np.int64) * config.INDEX_STRIDE,
+        'offset': np.array(line_starts, dtype = np.int64),
+        'time_ns': pd.to_datetime(pd.Series(timestamps, dtype = str)).to_numpy(dtype = 'datetime64[ns]').astype(np.int64),
+        'n_samples': n_samples,
+        'source_size': os.path.getsize(file_path_csv),
+        'source_mtime_ns': os.stat(file_path_csv).st_mtime_ns,
+        'target_value': config.TARGET_VALUE,
+        'filter_start': find_initial_filter_start(file_path, config.TARGET_VALUE),
+        'increasing': timestamps_increasing(file_path),
+    }
+    np.savez(add_index_extension(file_path), **index)
+
+    return index
+
+def load_index(file_path: str) -> dict:
+    '''
+    Loads the sidecar index of a case. It is (re)built if it does not exist, if the csv changed
+    since it was built or if config.TARGET_VALUE changed
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        dict: 'sample', 'offset' and 'time_ns' arrays (one entry per INDEX_STRIDE samples),
+            'n_samples', 'filter_start', 'increasing' and the values used to detect a stale index
+    '''
+    file_path_csv: str = add_csv_extension(file_path)
+    try:
+        with np.load(add_index_extension(file_path)) as data:
+            index: dict = {key: data[key] if data[key].ndim else data[key].item() for key in data.files}
+    except (OSError, ValueError):
+        return build_index(file_path)
+
+    stat = os.stat(file_path_csv)
+    if ('increasing' not in index or index['source_size'] != stat.st_size or index['source_mtime_ns'] != stat.st_mtime_ns
+            or index['target_value'] != config.TARGET_VALUE or (len(index['sample']) > 1 and index['sample'][1] != config.INDEX_STRIDE)):
+        return build_index(file_path)
+
+    return index
+
+def read_samples(file_path: str, start: int, stop: int) -> pd.DataFrame:
+    '''
+    Reads samples start..stop (stop excluded) of a case into the same DataFrame that
+    read_csv_file returns, seeking to the nearest indexed line instead of parsing the whole csv.
+    The binary recording is used when there is one
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        start (int): first sample
+        stop (int): sample after the last one
+
+    Returns:
+        Pandas DataFrame with samples numbered from 'start'
+    '''
+    from recording_helper import has_recording, read_recording
+
+    start = max(start, 0)
+    if has_recording(file_path):
+        df: pd.DataFrame = read_recording(file_path, start, stop)
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    index: dict = load_index(file_path)
+    stop = min(stop, index['n_samples'])
+    entry: int = int(np.searchsorted(index['sample'], start, side = 'right')) - 1
+
+    with open(add_csv_extension(file_path), 'rb') as f:
+        f.seek(int(index['offset'][entry]))
+        df = pd.read_csv(
+            f,
+            sep = ',',
+            header = None,
+            names = ['timeStamp', 'Acc_X', 'Acc_Y', 'Acc_Z'],
+            usecols = [0, 1, 2, 3],
+            dtype = {'timeStamp': str, 'Acc_X': float, 'Acc_Y': float, 'Acc_Z': float},
+            nrows = max(stop - int(index['sample'][entry]), 0),
+            encoding = 'utf-8',
+        )
+
+    df = df.iloc[start - int(index['sample'][entry]):]
+    df.index = pd.RangeIndex(start, start + len(df))
+    df['timeStamp'] = pd.to_datetime(df['timeStamp'])
+
+    return df
+
+def find_sample(file_path: str, time_stamp: pd.Timestamp) -> int:
+    '''
+    Finds the first sample at or after a timestamp
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        time_stamp (pd.Timestamp): time to look for
+
+    Returns:
+        int: sample number
+    '''
+    from recording_helper import add_recording_extension, has_recording, read_recording_index
+
+    target: int = pd.Timestamp(time_stamp).value
+
+    if has_recording(file_path):
+        _, chunks = read_recording_index(add_recording_extension(file_path))
+        samples: NDArray = chunks['sample_start'].astype(np.int64)
+        times: NDArray = chunks['first_ts']
+        stride: int = int(chunks['n'][0]) if len(chunks) else 0
+    else:
+        index: dict = load_index(file_path)
+        samples, times, stride = index['sample'], index['time_ns'], config.INDEX_STRIDE
+
+    # Coarse lookup in the index, then exact lookup in the block that contains the timestamp
+    entry: int = max(int(np.searchsorted(times, target, side = 'right')) - 1, 0)
+    if len(samples) == 0:
+        return 0
+    block: pd.DataFrame = read_samples(file_path, int(samples[entry]), int(samples[entry]) + stride)
+
+    return int(samples[entry]) + int(np.searchsorted(block['timeStamp'].to_numpy(dtype = 'datetime64[ns]').astype(np.int64), target))
+
+def load_filtered_range(file_path: str, start: int, stop: int, warmup: int = config.BUTTERWORTH_WARMUP) -> tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Loads samples start..stop and applies the Butterworth filter to them. 'warmup' extra samples
+    are filtered on each side and then dropped, so the result matches filtering the whole recording
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        start (int): first sample
+        stop (int): sample after the last one
+        warmup (int): samples added on each side while filtering
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: raw and Butterworth filtered samples, numbered from 'start'
+    '''
+    df: pd.DataFrame = read_samples(file_path, start - warmup, stop + warmup)
+    df_butterworth: pd.DataFrame = apply_butterworth_filter(df, config.BUTTERWORTH_ORDER, config.BUTTERWORTH_CUTOFF, config.FS)
+    keep = (df.index >= start) & (df.index < stop)
+
+    return df[keep], df_butterworth[keep]
+
+def load_time_range(file_path: str, t_start: pd.Timestamp, t_end: pd.Timestamp, padding: float = 0.0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Loads and filters the samples between two timestamps (see load_filtered_range)
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        t_start (pd.Timestamp): start of the range
+        t_end (pd.Timestamp): end of the range
+        padding (float): seconds added on each side of the range
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: raw and Butterworth filtered samples
+    '''
+    start: int = find_sample(file_path, pd.Timestamp(t_start) - pd.Timedelta(seconds = padding))
+    stop: int = find_sample(file_path, pd.Timestamp(t_end) + pd.Timedelta(seconds = padding))
+
+    return load_filtered_range(file_path, start, stop)
+
+def get_repaired_case(file_path: str) -> pd.DataFrame | None:
+    '''
+    The case as main.py analyses it, if validate_timestamps changed its samples (duplicated or
+    reversed timestamps, or TIMESTAMP_POLICY = 'resample'). ROI indexes then count the rows of
+    this DataFrame instead of csv samples. It comes from the read and timestamps stages, so it is
+    loaded from the cache after main.py ran on the case
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        pd.DataFrame | None: repaired DataFrame, indexed by the source sample number of each row,
+            or None if the samples are analysed as they are in the file
+    '''
+    from recording_helper import add_recording_extension, has_recording, read_recording_index
+
+    # Strictly increasing timestamps are analysed as they are: the flag is stored at conversion
+    # (binary recording) or in the sample index, so only a repaired case is read in full
+    if config.TIMESTAMP_POLICY != 'resample':
+        if has_recording(file_path):
+            increasing: bool = read_recording_index(add_recording_extension(file_path))[0]['increasing']
+        else:
+            increasing = load_index(file_path)['increasing']
+        if increasing:
+            return None
+
+    from pipeline_helper import read_stage, timestamps_stage
+
+    df, key = read_stage(file_path)
+    if df is None or df.empty:
+        raise ValueError(f'{file_path} could not be read')
+    (df, report), _ = timestamps_stage(df, key)
+    if df is None:
+        raise ValueError(f'{file_path}: timestamps rejected by TIMESTAMP_POLICY = {report["policy"]!r}')
+
+    return df if report['repaired'] else None
+
+def get_filter_row(df: pd.DataFrame) -> int:
+    '''
+    Row where initial_filter starts the filtered DataFrame (0 if Acc_Z never exceeds TARGET_VALUE)
+
+    Args:
+        df (pd.DataFrame): DataFrame returned by get_repaired_case
+
+    Returns:
+        int: row number (position)
+    '''
+    above: NDArray[np.intp] = np.flatnonzero(df['Acc_Z'].to_numpy() > config.TARGET_VALUE)
+
+    return int(above[0]) if len(above) else 0
+
+def get_file_filter_start(file_path: str) -> int:
+    '''
+    Sample number where initial_filter starts, for a case analysed as it is in the file
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        int: sample number
+    '''
+    from recording_helper import add_recording_extension, has_recording
+
+    if has_recording(file_path):
+        # Binary recordings have no sidecar index, search the chunks in order
+        from recording_helper import read_recording_index, read_recording
+
+        _, chunks = read_recording_index(add_recording_extension(file_path))
+        for entry in chunks:
+            df: pd.DataFrame = read_recording(file_path, int(entry['sample_start']), int(entry['sample_start'] + entry['n']))
+            above: NDArray[np.intp] = np.flatnonzero(df['Acc_Z'].to_numpy() > config.TARGET_VALUE)
+            if len(above):
+                return int(entry['sample_start']) + int(above[0])
+        return 0
+
+    return int(load_index(file_path)['filter_start'])
+
+def get_filter_start(file_path: str) -> int:
+    '''
+    Sample number where initial_filter starts the filtered DataFrame. ROI indexes (get_indexes)
+    are counted from this sample (for a repaired case, from this row of get_repaired_case)
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        int: sample number in the file
+    '''
+    repaired: pd.DataFrame | None = get_repaired_case(file_path)
+    if repaired is not None:
+        return int(repaired.index[get_filter_row(repaired)])
+
+    return get_file_filter_start(file_path)
+
+def load_repaired_roi(repaired: pd.DataFrame, roi: list[int], padding: int = 0, warmup: int = config.BUTTERWORTH_WARMUP) -> tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    load_roi for a case repaired by validate_timestamps: the region is taken from the repaired
+    rows, as main.py analysed them, and filtered with 'warmup' extra rows on each side
+
+    Args:
+        repaired (pd.DataFrame): DataFrame returned by get_repaired_case
+        roi (list[int]): [start, end] indexes of the region of interest
+        padding (int): rows added on each side of the region
+        warmup (int): rows added on each side while filtering
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: raw and Butterworth filtered rows, numbered as in the
+            DataFrame returned by initial_filter
+    '''
+    filter_row: int = get_filter_row(repaired)
+    start: int = max(roi[0] - padding, 0)
+    stop: int = roi[1] + padding + 1
+    first: int = max(filter_row + start - warmup, 0)
+
+    df: pd.DataFrame = repaired.iloc[first : filter_row + stop + warmup]
+    df = df.set_axis(pd.RangeIndex(first - filter_row, first - filter_row + len(df)))
+    df_butterworth: pd.DataFrame = apply_butterworth_filter(df, config.BUTTERWORTH_ORDER, config.BUTTERWORTH_CUTOFF, config.FS)
+    keep = (df.index >= start) & (df.index < stop)
+
+    return df[keep], df_butterworth[keep]
+
+def load_roi(file_path: str, roi: list[int], padding: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Loads one region of interest (one item of get_indexes) with its Butterworth filtered signal.
+    The rows are numbered as in the DataFrame returned by initial_filter, so
+    extract_accel_values_from_roi can be applied to the result
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        roi (list[int]): [start, end] indexes of the region of interest
+        padding (int): samples added on each side of the region
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: raw and Butterworth filtered samples
+    '''
+    repaired: pd.DataFrame | None = get_repaired_case(file_path)
+    if repaired is not None:
+        return load_repaired_roi(repaired, roi, padding)
+
+    filter_start: int = get_file_filter_start(file_path)
+    start: int = max(roi[0] - padding, 0)
+    # extract_accel_values_from_roi includes the end index
+    df, df_butterworth = load_filtered_range(file_path, filter_start + start, filter_start + roi[1] + padding + 1)
+    df.index = df.index - filter_start
+    df_butterworth.index = df_butterworth.index - filter_start
+
+    return df, df_butterworth
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description = 'Load and review one region of interest')
+    parser.add_argument('case', help = 'case number (file name without .csv)')
+    parser.add_argument('--roi', nargs = 2, type = int, required = True, metavar = ('START', 'END'), help = 'roi indexes as printed by main.py')
+    parser.add_argument('--padding', type = int, default = config.WINDOW_SIZE, help = 'samples shown on each side of the roi')
+    parser.add_argument('--no-plot', dest = 'plot', action = 'store_false', default = config.PLOT, help = 'only print the max accelerations')
+    args = parser.parse_args()
+
+    from acceleration_helper import get_max_accelerations
+    from region_helper import extract_accel_values_from_roi
+
+    df, df_butterworth = load_roi(args.case, args.roi, args.padding)
+    amax_x_list, amax_y_list, amax_z_list = get_max_accelerations(extract_accel_values_from_roi(df, [args.roi]))
+    print(f'roi {args.roi}: amax_x = {amax_x_list}, amax_y = {amax_y_list}, amax_z = {amax_z_list}')
+
+    if args.plot:
+        from graph_helper import plot_accel_data_with_roi_and_maxaccel
+
+        # The plot uses positions, not index labels
+        offset: int = int(df.index[0])
+        plot_accel_data_with_roi_and_maxaccel(df.reset_index(drop = True), [[args.roi[0] - offset, args.roi[1] - offset]], amax_x_list, amax_y_list, amax_z_list)
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,256 @@
+# Recovery Score Calculations: Kernel helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: fused Z-axis kernel for the streaming analysis (stream_helper.StreamState).
+# One pass over a block of samples runs the causal Butterworth sections (same as sosfilt), the
+# jerk difference and the window accumulators, without materializing the filtered signal.
+# The accumulators are count, mean and M2 of consecutive blocks of gcd(WINDOW_SIZE, STEP_SIZE)
+# jerk samples; every window is the merge of its blocks (Chan et al.), so the window SD is the
+# same as calculate_window_sd on the causal jerk.
+# The fused loop is only used when it is compiled with Numba (installed and KERNEL_NUMBA True).
+# Without Numba, one block at a time is too small for a fused NumPy version to pay off, so the
+# kernel runs separate passes instead: sosfilt, jerk difference and the SD of the buffered jerk.
+# Kernels can be pickled (watch_helper.py checkpoints) and restored with or without Numba.
+# The batch analysis keeps filtfilt (zero phase): its backward pass needs the whole recording,
+# so it can not be fused into one causal pass.
+
+from math import gcd
+
+import numpy as np
+
+import config
+
+from numpy.typing import NDArray
+from numpy.lib.stride_tricks import sliding_window_view
+
+_compiled_loop = None  # Numba version of _fused_loop, compiled on first use
+
+def _fused_loop(acc_z, time_ns, sos, zi, state, last_t, block_size, jerk, blocks):
+    '''
+    Filters, differentiates and accumulates one block of samples (compiled by Numba)
+
+    Args:
+        acc_z, time_ns: Acc_Z samples and their timestamps (ns)
+        sos, zi: filter sections and their state (updated in place)
+        state: [has previous sample, previous filtered Acc_Z, count, mean, M2 of the open block]
+            (updated in place)
+        last_t: [timestamp of the previous sample] (updated in place)
+        block_size: jerk samples per accumulator block
+        jerk, blocks: output arrays for the jerk and the count, mean, M2 of the completed blocks
+
+    Returns:
+        tuple: number of jerk values and of completed blocks written
+    '''
+    n_jerk = 0
+    n_blocks = 0
+    for i in range(len(acc_z)):
+        # Causal filter, transposed direct form II (as scipy.signal.sosfilt)
+        x = acc_z[i]
+        for s in range(sos.shape[0]):
+            y = sos[s, 0] * x + zi[s, 0]
+            zi[s, 0] = sos[s, 1] * x - sos[s, 4] * y + zi[s, 1]
+            zi[s, 1] = sos[s, 2] * x - sos[s, 5] * y
+            x = y
+
+        if state[0] != 0.0:
+            # Jerk (m/s^3) and Welford update of the open block
+            value = (x - state[1]) / ((time_ns[i] - last_t[0]) * 1e-9)
+            jerk[n_jerk] = value
+            n_jerk += 1
+            state[2] += 1.0
+            delta = value - state[3]
+            state[3] += delta / state[2]
+            state[4] += delta * (value - state[3])
+            if state[2] == block_size:
+                blocks[n_blocks, 0] = state[2]
+                blocks[n_blocks, 1] = state[3]
+                blocks[n_blocks, 2] = state[4]
+                n_blocks += 1
+                state[2] = 0.0
+                state[3] = 0.0
+                state[4] = 0.0
+
+        state[0] = 1.0
+        state[1] = x
+        last_t[0] = time_ns[i]
+
+    return n_jerk, n_blocks
+
+def get_compiled_loop():
+    '''
+    Numba compiled _fused_loop, or None if Numba is not installed or KERNEL_NUMBA is False
+    '''
+    global _compiled_loop
+
+    if _compiled_loop is None and config.KERNEL_NUMBA:
+        try:
+            from numba import njit
+        except ImportError:
+            return None
+        # nogil: blocks of several streams run at the same time in the stream executor threads
+        _compiled_loop = njit(cache = True, nogil = True)(_fused_loop)
+
+    return _compiled_loop
+
+class ZAxisKernel:
+    '''
+    Causal Butterworth filter, jerk and window SD of one stream, block by block. The samples not
+    yet covered by a full window are kept as accumulator blocks (fused) or as jerk values (separate)
+    '''
+
+    def __init__(self, sos: NDArray[np.float64], window_size: int = config.WINDOW_SIZE, step_size: int = config.STEP_SIZE) -> None:
+        self.sos: NDArray[np.float64] = np.ascontiguousarray(sos, dtype = np.float64)
+        self.window_size: int = window_size
+        self.step_size: int = step_size
+        self.block_size: int = gcd(window_size, step_size)
+        self.window_blocks: int = window_size // self.block_size
+        self.step_blocks: int = step_size // self.block_size
+        self.zi: NDArray[np.float64] | None = None  # filter state, set on the first sample
+        self.state: NDArray[np.float64] = np.zeros(5)  # see _fused_loop
+        self.last_t: NDArray[np.int64] = np.zeros(1, dtype = np.int64)
+        self.jerk_tail: NDArray[np.float64] = np.empty(0)  # open block of _process_numpy
+        self.block_buffer: NDArray[np.float64] = np.empty((0, 3))  # completed blocks not yet in a full window (fused)
+        self.jerk_buffer: NDArray[np.float64] = np.empty(0)  # jerk not yet in a full window (separate passes)
+        self.loop = get_compiled_loop()
+        self.fused: bool = self.loop is not None
+
+    @property
+    def uses_numba(self) -> bool:
+        return self.fused and self.loop is not None
+
+    def __getstate__(self) -> dict:
+        # The compiled function is not pickled, it is looked up again when restored
+        return {key: value for key, value in self.__dict__.items() if key != 'loop'}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.loop = get_compiled_loop()
+        if self.loop is not None and not self.fused:
+            # Saved without Numba: the buffered jerk becomes accumulator blocks
+            self.block_buffer, self.jerk_tail = self._get_blocks(self.jerk_buffer)
+            self.jerk_buffer = np.empty(0)
+            self.fused = True
+        if self.loop is not None and len(self.jerk_tail):
+            # Open block saved by _process_numpy: continue it as count, mean and M2
+            self.state[2:] = len(self.jerk_tail), self.jerk_tail.mean(), np.square(self.jerk_tail - self.jerk_tail.mean()).sum()
+            self.jerk_tail = np.empty(0)
+
+    def process(self, time_ns: NDArray[np.int64], acc_z: NDArray[np.float64]) -> NDArray[np.float64]:
+        '''
+        Runs a block of samples through the kernel. The windows they complete are returned by get_window_sd
+
+        Args:
+            time_ns (NDArray[np.int64]): strictly increasing timestamps in ns
+            acc_z (NDArray[np.float64]): raw Acc_Z
+
+        Returns:
+            NDArray[np.float64]: jerk of the block (one value less than samples for the very first block)
+        '''
+        time_ns = np.ascontiguousarray(time_ns, dtype = np.int64)
+        acc_z = np.ascontiguousarray(acc_z, dtype = np.float64)
+        if len(acc_z) == 0:
+            return np.empty(0)
+
+        if self.zi is None:
+            from scipy.signal import sosfilt_zi
+            # Starts in steady state on the first sample
+            self.zi = sosfilt_zi(self.sos) * acc_z[0]
+
+        if not self.fused:
+            jerk: NDArray[np.float64] = self._filter_jerk(time_ns, acc_z)
+            self.jerk_buffer = np.concatenate((self.jerk_buffer, jerk))
+            return jerk
+
+        if self.loop is not None:
+            jerk = np.empty(len(acc_z))
+            blocks: NDArray[np.float64] = np.empty(((len(acc_z) + int(self.state[2])) // self.block_size + 1, 3))
+            n_jerk, n_blocks = self.loop(acc_z, time_ns, self.sos, self.zi, self.state, self.last_t, self.block_size, jerk, blocks)
+            jerk, blocks = jerk[:n_jerk], blocks[:n_blocks]
+        else:
+            # Fused kernel restored without Numba
+            jerk, blocks = self._process_numpy(time_ns, acc_z)
+        self.block_buffer = np.concatenate((self.block_buffer, blocks))
+
+        return jerk
+
+    def _filter_jerk(self, time_ns: NDArray[np.int64], acc_z: NDArray[np.float64]) -> NDArray[np.float64]:
+        '''
+        Causal filter (sosfilt) and jerk of a block, including the difference with the last sample of the previous block
+        '''
+        from scipy.signal import sosfilt
+
+        filtered, self.zi = sosfilt(self.sos, acc_z, zi = self.zi)
+        if self.state[0]:
+            jerk: NDArray[np.float64] = np.diff(filtered, prepend = self.state[1]) / (np.diff(time_ns, prepend = self.last_t[0]) * 1e-9)
+        else:
+            jerk = np.diff(filtered) / (np.diff(time_ns) * 1e-9)
+        self.state[0], self.state[1], self.last_t[0] = 1.0, filtered[-1], time_ns[-1]
+
+        return jerk
+
+    def _get_blocks(self, values: NDArray[np.float64]) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        '''
+        Count, mean and M2 of the full blocks of a run of jerk values, and the values left over
+        '''
+        n_full: int = len(values) // self.block_size
+        full: NDArray[np.float64] = values[:n_full * self.block_size].reshape(n_full, self.block_size)
+        means: NDArray[np.float64] = full.mean(axis = 1)
+        blocks: NDArray[np.float64] = np.column_stack((np.full(n_full, float(self.block_size)), means, np.square(full - means[:, None]).sum(axis = 1)))
+
+        return blocks, values[n_full * self.block_size:]
+
+    def _process_numpy(self, time_ns: NDArray[np.int64], acc_z: NDArray[np.float64]) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        '''
+        Same as the compiled loop with vectorized calls, for a fused kernel restored without Numba.
+        The open block is kept as its jerk values (jerk_tail) instead of count, mean and M2
+        '''
+        jerk: NDArray[np.float64] = self._filter_jerk(time_ns, acc_z)
+
+        first_block: NDArray[np.float64] = np.empty((0, 3))
+        values: NDArray[np.float64] = np.concatenate((self.jerk_tail, jerk))
+        count: int = int(self.state[2])
+        if count:
+            # Open block left by the compiled loop: Chan merge
+            head: NDArray[np.float64] = values[:self.block_size - count]
+            head_mean: float = head.mean() if len(head) else 0.0
+            total: int = count + len(head)
+            delta: float = head_mean - self.state[3]
+            self.state[2:] = total, self.state[3] + delta * len(head) / total, self.state[4] + np.square(head - head_mean).sum() + delta ** 2 * count * len(head) / total
+            if total < self.block_size:
+                return jerk, first_block
+            first_block = self.state[2:].reshape(1, 3).copy()
+            self.state[2:] = 0.0
+            values = values[len(head):]
+
+        blocks, self.jerk_tail = self._get_blocks(values)
+
+        return jerk, (np.concatenate((first_block, blocks)) if len(first_block) else blocks)
+
+    def get_window_sd(self) -> NDArray[np.float64]:
+        '''
+        SD of every complete window of the jerk processed so far that was not returned yet (the
+        first window starts at the first jerk value, the next ones every step_size values). The
+        jerk no later window needs is dropped
+
+        Returns:
+            NDArray[np.float64]: SD of each window (same as calculate_window_sd on the causal jerk)
+        '''
+        if not self.fused:
+            if len(self.jerk_buffer) < self.window_size:
+                return np.empty(0)
+            n_new: int = (len(self.jerk_buffer) - self.window_size) // self.step_size + 1
+            sd: NDArray[np.float64] = sliding_window_view(self.jerk_buffer, self.window_size)[::self.step_size][:n_new].std(axis = 1)
+            self.jerk_buffer = self.jerk_buffer[n_new * self.step_size:]
+            return sd
+
+        if len(self.block_buffer) < self.window_blocks:
+            return np.empty(0)
+
+        # Blocks have the same count, so the window mean is the mean of the block means
+        means: NDArray[np.float64] = sliding_window_view(self.block_buffer[:, 1], self.window_blocks)[::self.step_blocks]
+        m2: NDArray[np.float64] = sliding_window_view(self.block_buffer[:, 2], self.window_blocks)[::self.step_blocks]
+        window_mean: NDArray[np.float64] = means.mean(axis = 1)
+        window_m2: NDArray[np.float64] = m2.sum(axis = 1) + self.block_size * np.square(means - window_mean[:, None]).sum(axis = 1)
+        self.block_buffer = self.block_buffer[len(means) * self.step_blocks:]
+
+        return np.sqrt(window_m2 / (self.window_blocks * self.block_size))
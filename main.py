@@ -1,78 +1,118 @@
 # RS: Main Script
 # Script created 3/25/2024
-# Last revision 5/31/2025
+# Last revision 10/19/2026
 # Notes: this script uses the SD method to detect regions of interest using the jerk signal.
 # once identified, it extracts the indexes of the regions of interest (ROIs) from the jerk signal.
 # It then calculates the maximum accelerations for each axis (Acc_X, Acc_Y, Acc_Z) within those ROIs 
 # # using the original, unfiltered signal
 # Sensitivity variables in cofig file
+# Plotting (matplotlib / PyQt6) is only imported when a plot is actually drawn, so
+# 'python main.py <case> --no-plot' starts without loading the graphics stack
+# The stages up to the window SD are memoized on disk (pipeline_helper.py / cache_helper.py)
 
+import argparse
 import pandas as pd
+
+from contextlib import nullcontext
 import numpy as np
 
 import config
 
 from acceleration_helper import get_max_accelerations, get_sa_2axes, get_sumua
-from attempt_detection_helper import calculate_window_sd, detect_roi_sd, get_attempts, get_indexes, set_jerk_threshold
-from derivative_helper import calculate_derivatives
-from file_helper import read_csv_file, initial_filter, apply_moving_average, apply_butterworth_filter
-from graph_helper import plot_acceleration_data, get_plot_jerk, get_plot_jerk_with_roi, plot_accel_data_with_roi_and_maxaccel
+from attempt_detection_helper import detect_roi_sd, get_attempts, get_indexes, map_indexes_to_original, set_jerk_threshold
+from file_helper import apply_moving_average
 from numpy.typing import NDArray
+from pipeline_helper import get_decimated_windows, get_detector_columns, get_detector_signal, read_stage, timestamps_stage, initial_filter_stage, butterworth_stage, decimation_stage, jerk_stage, window_sd_stage
 from region_helper import extract_accel_values_from_roi
 from output_results_helper import process_recovery
 
-def main() -> None:
+def main(file_path: str | None = None, plot: bool = config.PLOT, export_path: str | None = None) -> None:
+    '''
+    Runs the full analysis for one case
+
+    Args:
+        file_path (str | None): case number (file_name). If None, the user is prompted for it
+        plot (bool): if False, no graphs are drawn and the plotting modules are never imported
+        export_path (str | None): dataset folder the ROI samples are appended to (see export_helper.py)
+    '''
+    if file_path is None:
+        file_path = input('Enter case number: ')
 
-    file_path: str = input('Enter case number: ')
+    # Window and step sizes at the decimated rate; invalid decimation settings stop here
+    window_size, step_size = get_decimated_windows(config.DECIMATION_FACTOR)
 
-    df: pd.DataFrame = read_csv_file(file_path)
+    df, key = read_stage(file_path)
 
-    if df is not None:
+    if df is not None and not df.empty:
         print('File read successfully...')
         print("Columns in DataFrame:", df.columns)
         
     else:
         print('Failed to load DataFrame')
         return # exit if the file cannot be loaded
+
+    # Checks duplicated, out-of-order and missing samples before any filtering is done
+    (df, timestamp_report), key = timestamps_stage(df, key)
+    print(f'Timestamps checked: {timestamp_report}')
+
+    if df is None:
+        print('File rejected: timestamps are not strictly increasing')
+        return # exit if the timestamps cannot be used
     
     # Creates new df in which values are ignored until values in the Z-axis reach 'target_value' 
     # signaling horse getting onto sternal recumbency
-    df_filtered: pd.DataFrame = initial_filter(df, config.TARGET_VALUE)
+    df_filtered, filter_key = initial_filter_stage(df, key)
     print('Initial filter applied successfully')
-       
-    # Apply moving average filter with a specified 'target_moving_avg' value
-    df_moving_avg: pd.DataFrame = apply_moving_average(df_filtered, config.TARGET_MOVING_AVG)
-    print('Moving average applied successfully')
 
-    df_butterworth: pd.DataFrame = apply_butterworth_filter(df_filtered, config.BUTTERWORTH_ORDER, config.BUTTERWORTH_CUTOFF, config.FS)
+    # Only the columns used by the detector (Acc_Z for 'sd') are kept from here on;
+    # the three axes are filtered for the review plot
+    df_butterworth, key = butterworth_stage(df_filtered, filter_key, get_detector_columns())
     print('Butterworth filter applied successfully')
 
-    # Plot data to review application of filters
-    plot_acceleration_data(df_filtered, df_moving_avg, df_butterworth)
-          
-    # Create new DataFrame after applying avg filter with Acc_Z and timeStamp values only 
-    df_avg = pd.DataFrame({'timeStamp': df_moving_avg['timeStamp'], 'Acc_Z': df_moving_avg['Acc_Z']})
-    
-    # Create new DataFrame after applying Butterworth filter with Acc_Z and timeStamp values only
-    df_butterworth = pd.DataFrame({'timeStamp': df_butterworth['timeStamp'], 'Acc_Z': df_butterworth['Acc_Z']})
+    if plot:
+        from graph_helper import plot_acceleration_data
+
+        df_butterworth_axes, _ = butterworth_stage(df_filtered, filter_key, ['Acc_X', 'Acc_Y', 'Acc_Z'])
+
+        # Apply moving average filter with a specified 'target_moving_avg' value
+        # (only used to review the filters, so it is skipped when not plotting)
+        df_moving_avg: pd.DataFrame = apply_moving_average(df_filtered, config.TARGET_MOVING_AVG)
+        print('Moving average applied successfully')
+
+        # Plot data to review application of filters
+        plot_acceleration_data(df_filtered, df_moving_avg, df_butterworth_axes)
+
+    # Optional decimation: the jerk, window SD and plots then run at FS / DECIMATION_FACTOR
+    # with the window and step sizes translated to the new rate
+    decimation_factor: int = config.DECIMATION_FACTOR
+    fs: float = config.FS / decimation_factor
+    df_butterworth, key = decimation_stage(df_butterworth, key)
+    if decimation_factor > 1:
+        print(f'Decimated by {decimation_factor} to {fs} Hz')
 
     # Calculates first derivative (jerk) from the filtered dataset
-    jerk: NDArray[np.float64] = calculate_derivatives(df_butterworth)
+    # Uniformly sampled files skip the timestamp arithmetic (fast path)
+    jerk, key = jerk_stage(df_butterworth, key, timestamp_report['uniform'])
     print('First derivative calculated successfully')
 
-    get_plot_jerk(jerk, df_butterworth)          
+    if plot:
+        from graph_helper import get_plot_jerk
+        get_plot_jerk(jerk, df_butterworth)          
     
+    # Signal of the detector: the jerk, or the acceleration magnitude for the 'energy' detector
+    detector_signal: NDArray[np.float64] = get_detector_signal(df_butterworth, jerk)
+
     # Set Jerk threshold and calculate mean Jerk to be able to re calibrate the threshold
-    mean_jerk, std_jerk, jerk_threshold_cal = set_jerk_threshold(jerk, config.FACTOR, config.PERCENTILE)
+    mean_jerk, std_jerk, jerk_threshold_cal = set_jerk_threshold(detector_signal, config.FACTOR, config.PERCENTILE)
     print('Jerk mean, SD and threshold calculated successfully')
     #print(f'Mean Jerk = {mean_jerk}')
     #print(f'Jerk threshold set to {jerk_threshold_cal}')
     
     print('Calculating ROIs on the jerk signal...')
 
-    # Calculates standard deviation for each window
-    AccZ_sd: list[float] = calculate_window_sd(jerk, config.WINDOW_SIZE, config.STEP_SIZE)
-    print('sd_list calculated succesfully using jerk dataset')
+    # Calculates standard deviation (or energy) for each window
+    AccZ_sd, _ = window_sd_stage(detector_signal, key, window_size, step_size)
+    print(f'sd_list calculated succesfully using the {config.DETECTOR} detector')
 
     # Detects regions of interest on the jerk signal based on standard deviation method
     roi_sd: list[float] = detect_roi_sd(AccZ_sd, jerk_threshold_cal)
@@ -83,17 +123,27 @@ def main() -> None:
     # Alternatively, the get_roi_indexes function can be used to get the indexes of the regions of interest
    
     # Plot jerk with regions of interest using sd method
-    get_plot_jerk_with_roi(jerk, df_butterworth, roi_sd, config.WINDOW_SIZE, config.STEP_SIZE, file_path)
-
-    # Calculate Number of failed attempts        
-    number_failed_attempts: int = get_attempts(roi_sd)
-    print(f'Number of Failed Attempts = {number_failed_attempts}')
+    if plot:
+        from graph_helper import get_plot_jerk_with_roi
+        get_plot_jerk_with_roi(jerk, df_butterworth, roi_sd, window_size, step_size, file_path)
 
     # Extract list with indexes of the regions of interest using the jerk signal
-    roi_indexes: list[list[int]] = get_indexes(roi_sd, config. WINDOW_SIZE, config.STEP_SIZE)
+    roi_indexes: list[list[int]] = get_indexes(roi_sd, window_size, step_size)
+    # Back to positions in the original (not decimated) signal
+    roi_indexes = map_indexes_to_original(roi_indexes, decimation_factor)
     print('indexes of the regions of interest extracted successfully')
     print(f'roi_indexes: {roi_indexes}')
 
+    # extract_accel_values_from_roi skips ROIs outside the DataFrame; keep the lists aligned
+    # (as pipeline_helper.detect_attempts)
+    kept: list[int] = [i for i, idx in enumerate(roi_indexes) if idx[0] in df_filtered.index and idx[1] in df_filtered.index]
+    roi_sd = [roi_sd[i] for i in kept]
+    roi_indexes = [roi_indexes[i] for i in kept]
+
+    # Calculate Number of failed attempts        
+    number_failed_attempts: int = get_attempts(roi_sd)
+    print(f'Number of Failed Attempts = {number_failed_attempts}')
+
     # Apply indexes to original dataset to obtain the actual acceleration values within each of the ROIs
     extracted_roi: list[pd.DataFrame] = extract_accel_values_from_roi(df_filtered, roi_indexes)
     print('ROI values extracted successfully')
@@ -104,7 +154,9 @@ def main() -> None:
     print('Max accelerations calculated successfully')
 
     # Plot df with ROIs
-    plot_accel_data_with_roi_and_maxaccel(df_filtered, roi_indexes, amax_x_list, amax_y_list, amax_z_list)
+    if plot:
+        from graph_helper import plot_accel_data_with_roi_and_maxaccel
+        plot_accel_data_with_roi_and_maxaccel(df_filtered, roi_indexes, amax_x_list, amax_y_list, amax_z_list, file_path)
     #plot_accel_data_with_max_accel(df_filtered, extracted_roi, amax_x_list, amax_y_list, amax_z_list)
 
     sa_2axes: float = get_sa_2axes(amax_x_list, amax_y_list)
@@ -114,12 +166,34 @@ def main() -> None:
     #print(f'ua_list = {ua_list}')
     #print(f'sumua = {sumua}')
             
-    rs_2axes_py: float = process_recovery(file_path, config.JERK_THRESHOLD, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua)
+    rs_2axes_py: float = process_recovery(file_path, config.JERK_THRESHOLD, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, config.DETECTOR)
+
+    # Append the ROI samples and scores to the export dataset
+    if export_path is not None:
+        from export_helper import append_case
+
+        added: int = append_case(export_path, file_path, {
+            'df_filtered': df_filtered,
+            'roi_sd': roi_sd,
+            'roi_indexes': roi_indexes,
+            'extracted_roi': extracted_roi,
+            'amax_x_list': amax_x_list,
+            'amax_y_list': amax_y_list,
+            'amax_z_list': amax_z_list,
+            'jerk_threshold_cal': jerk_threshold_cal,
+            'number_failed_attempts': number_failed_attempts,
+            'sa_2axes': sa_2axes,
+            'sumua': sumua,
+            'rs_2axes_py': rs_2axes_py,
+        })
+        print(f'{added} ROIs exported to {export_path}')
 
     # display output_results in terminal
     print(f'results are:')
     print(f'file name: {file_path}')
     print(f'jerk_threshold: {config.JERK_THRESHOLD}')
+    # With the 'energy' detector the statistics below are of the acceleration magnitude deviation
+    print(f'detector: {config.DETECTOR}')
     print(f'mean_jerk: {mean_jerk}')
     print(f'std_jerk:{std_jerk}')
     print(f'jerk_threshold_cal: {jerk_threshold_cal}')
@@ -130,6 +204,38 @@ def main() -> None:
     print(f'sumua= {sumua}')
     print(f'rs_2axes_py= {rs_2axes_py}')
  
+def parse_args() -> argparse.Namespace:
+    '''
+    Parses the command line arguments
+
+    Returns:
+        argparse.Namespace: case numbers to process, plotting, export and profiling options
+    '''
+    parser = argparse.ArgumentParser(description = 'Recovery Score analysis')
+    parser.add_argument('cases', nargs = '*', help = 'case numbers (file names without .csv). Prompts if none are given')
+    parser.add_argument('--no-plot', dest = 'plot', action = 'store_false', default = config.PLOT, help = 'skip all graphs (matplotlib is not imported)')
+    parser.add_argument('--export', dest = 'export_path', default = None, help = 'dataset folder the ROI samples are appended to')
+    parser.add_argument('--profile', action = 'store_true', help = f'profile every case into {config.PROFILE_OUTPUT}/ (implies --no-plot)')
+    parser.add_argument('--profiler', default = config.PROFILER, choices = ['cprofile', 'sampling'], help = f'profiler used by --profile (default: {config.PROFILER})')
+
+    return parser.parse_args()
+
 if __name__ == "__main__":
     
-    main()
\ No newline at end of file
+    args: argparse.Namespace = parse_args()
+
+    # The case number is asked for before profiling starts
+    cases: list[str] = args.cases if args.cases else [input('Enter case number: ')]
+
+    if args.profile:
+        from profile_helper import print_summary, profile_case
+
+        # Time spent with a plot window open (plt.show) would be counted as the case's run time
+        args.plot = False
+
+    for case in cases:
+        with profile_case(case, args.profiler) if args.profile else nullcontext():
+            main(case, args.plot, args.export_path)
+
+    if args.profile and len(cases) > 1:
+        print_summary(cases, args.profiler)
@@ -5,7 +5,7 @@
 from recovery_score_helper import get_rs_ua, get_rs_sa
 from CSV_helper import add_sa, add_ua
 
-def process_recovery(file_path: str, jerk_threshold: float, mean_jerk: float, std_jerk: float, jerk_threshold_cal: float, number_failed_attempts: int, sa_2axes: float, sumua: float) -> float:
+def process_recovery(file_path: str, jerk_threshold: float, mean_jerk: float, std_jerk: float, jerk_threshold_cal: float, number_failed_attempts: int, sa_2axes: float, sumua: float, detector: str = 'sd') -> float:
     '''
     Processes recovery scores depending whether it is one or more attempts and
     Logs them to a CSV file.
@@ -20,6 +20,7 @@ def process_recovery(file_path: str, jerk_threshold: float, mean_jerk: float, st
     number_failed_attempts (int): The number of failed attempts.
     sa_2axes (float): The value for sa_2axes.
     sumua (float): The value for sumua.
+    detector (str): The detector whose signal the mean, SD and threshold were calculated on ('sd' or 'energy').
         
     Returns: 
     rs_2axes_py (float): Recovery Score (whether there was one or more than one attempts)
@@ -27,11 +28,11 @@ def process_recovery(file_path: str, jerk_threshold: float, mean_jerk: float, st
 
     if number_failed_attempts >= 1: 
         recovery_score_ua: float = get_rs_ua(sa_2axes, sumua)
-        add_ua(file_path, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, recovery_score_ua)        
+        add_ua(file_path, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, sumua, recovery_score_ua, detector)        
         return recovery_score_ua
             
     else:
         recovery_score_sa: float = get_rs_sa(sa_2axes)
-        add_sa(file_path, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, recovery_score_sa)
+        add_sa(file_path, jerk_threshold, mean_jerk, std_jerk, jerk_threshold_cal, number_failed_attempts, sa_2axes, recovery_score_sa, detector)
         return recovery_score_sa
             
@@ -0,0 +1,274 @@
+# Recovery Score Calculations: Pipeline helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: the steps of main.py as separate stages. Each stage is memoized on disk (cache_helper.py)
+# with a key built from its input key and the config values it reads, so re-running a case after
+# changing e.g. FACTOR reuses everything up to the window SD.
+# run_case and detect_attempts chain the stages without plots for the tools that process many cases.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from acceleration_helper import get_max_accelerations, get_sa_2axes, get_sumua
+from cache_helper import get_file_key, memoize
+from attempt_detection_helper import calculate_window_energy, calculate_window_sd, detect_roi_sd, get_magnitude_deviation, get_attempts, get_indexes, map_indexes_to_original, set_jerk_threshold
+from derivative_helper import calculate_derivatives, calculate_derivatives_uniform
+from file_helper import add_csv_extension, read_case_file, initial_filter, apply_butterworth_filter, apply_decimation
+from numpy.typing import NDArray
+from recovery_score_helper import get_rs
+from region_helper import extract_accel_values_from_roi
+from timestamp_helper import validate_timestamps
+
+DETECTORS: list[str] = ['sd', 'energy']
+
+# Version of the code of each stage, part of its cache key. Bump it when the stage or a function
+# it calls changes (e.g. calculate_window_sd for 'window_sd'), so outputs cached by the old code
+# are not used; the stages after it are recomputed too, as their input key changes
+STAGE_VERSIONS: dict[str, int] = {
+    'read': 1,
+    'timestamps': 3,
+    'initial_filter': 2,
+    'butterworth': 1,
+    'decimation': 1,
+    'jerk': 1,
+    'window_sd': 1,
+}
+
+def read_stage(file_path: str) -> tuple[pd.DataFrame, str]:
+    '''
+    read_case_file, cached by the path, size and modification time of the file actually read
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        tuple[pd.DataFrame, str]: DataFrame (empty if the case can not be read) and its cache key
+    '''
+    from recording_helper import add_recording_extension, has_recording
+
+    source_path: str = add_recording_extension(file_path) if has_recording(file_path) else add_csv_extension(file_path)
+    if not os.path.exists(source_path):
+        # Nothing to cache; read_case_file reports the error
+        return read_case_file(file_path), ''
+
+    return memoize('read', get_file_key(source_path), {}, lambda: read_case_file(file_path), STAGE_VERSIONS['read'])
+
+def timestamps_stage(df: pd.DataFrame, key: str) -> tuple[tuple[pd.DataFrame | None, dict], str]:
+    '''
+    validate_timestamps, cached
+
+    Returns:
+        tuple[tuple[pd.DataFrame | None, dict], str]: repaired DataFrame and report, and the cache key
+    '''
+    settings: dict = {
+        'TIMESTAMP_POLICY': config.TIMESTAMP_POLICY,
+        'TIMESTAMP_GAP_FACTOR': config.TIMESTAMP_GAP_FACTOR,
+        'TIMESTAMP_TOLERANCE': config.TIMESTAMP_TOLERANCE,
+        'FS': config.FS,
+    }
+
+    return memoize('timestamps', key, settings, lambda: validate_timestamps(df, config.TIMESTAMP_POLICY, config.FS), STAGE_VERSIONS['timestamps'])
+
+def initial_filter_stage(df: pd.DataFrame, key: str) -> tuple[pd.DataFrame, str]:
+    '''
+    initial_filter, cached
+    '''
+    return memoize('initial_filter', key, {'TARGET_VALUE': config.TARGET_VALUE}, lambda: initial_filter(df, config.TARGET_VALUE), STAGE_VERSIONS['initial_filter'])
+
+def butterworth_stage(df_filtered: pd.DataFrame, key: str, columns: list[str]) -> tuple[pd.DataFrame, str]:
+    '''
+    apply_butterworth_filter on the timeStamp and the given acceleration columns, cached
+    '''
+    settings: dict = {
+        'BUTTERWORTH_ORDER': config.BUTTERWORTH_ORDER,
+        'BUTTERWORTH_CUTOFF': config.BUTTERWORTH_CUTOFF,
+        'FS': config.FS,
+        'columns': tuple(columns),
+    }
+
+    return memoize('butterworth', key, settings, lambda: apply_butterworth_filter(df_filtered[['timeStamp'] + columns], config.BUTTERWORTH_ORDER, config.BUTTERWORTH_CUTOFF, config.FS), STAGE_VERSIONS['butterworth'])
+
+def get_decimated_windows(factor: int) -> tuple[int, int]:
+    '''
+    WINDOW_SIZE and STEP_SIZE translated to the decimated rate FS / factor
+
+    Args:
+        factor (int): decimation factor (1 keeps the sizes)
+
+    Returns:
+        tuple[int, int]: window and step size in decimated samples
+
+    Raises:
+        ValueError: if WINDOW_SIZE or STEP_SIZE is not a multiple of 'factor' (the windows would
+            no longer match the ones at FS), or if the Nyquist frequency after decimation is not
+            above BUTTERWORTH_CUTOFF (the filtered signal would alias)
+    '''
+    if factor < 1:
+        raise ValueError(f'DECIMATION_FACTOR must be 1 or more, got {factor}')
+    if config.WINDOW_SIZE % factor or config.STEP_SIZE % factor:
+        raise ValueError(f'WINDOW_SIZE ({config.WINDOW_SIZE}) and STEP_SIZE ({config.STEP_SIZE}) must be multiples of DECIMATION_FACTOR ({factor})')
+    if 0.5 * config.FS / factor <= config.BUTTERWORTH_CUTOFF:
+        raise ValueError(f'DECIMATION_FACTOR {factor} leaves a Nyquist frequency of {0.5 * config.FS / factor} Hz, not above BUTTERWORTH_CUTOFF ({config.BUTTERWORTH_CUTOFF} Hz)')
+
+    return config.WINDOW_SIZE // factor, config.STEP_SIZE // factor
+
+def decimation_stage(df_butterworth: pd.DataFrame, key: str) -> tuple[pd.DataFrame, str]:
+    '''
+    apply_decimation with config.DECIMATION_FACTOR, cached
+    '''
+    return memoize('decimation', key, {'DECIMATION_FACTOR': config.DECIMATION_FACTOR}, lambda: apply_decimation(df_butterworth, config.DECIMATION_FACTOR), STAGE_VERSIONS['decimation'])
+
+def jerk_stage(df_butterworth: pd.DataFrame, key: str, uniform: bool) -> tuple[NDArray[np.float64], str]:
+    '''
+    Jerk of the (decimated) Butterworth filtered Acc_Z, with the uniform-grid fast path when
+    'uniform' (see validate_timestamps) and config.JERK_FAST_PATH are set. Cached
+    '''
+    fs: float = config.FS / config.DECIMATION_FACTOR
+    fast_path: bool = config.JERK_FAST_PATH and uniform
+    settings: dict = {
+        'fast_path': fast_path,
+        'fs': fs,
+        'JERK_SMOOTHING': config.JERK_SMOOTHING if fast_path else None,
+        'SAVGOL_WINDOW': config.SAVGOL_WINDOW,
+        'SAVGOL_POLYORDER': config.SAVGOL_POLYORDER,
+    }
+
+    def compute() -> NDArray[np.float64]:
+        if fast_path:
+            return calculate_derivatives_uniform(df_butterworth['Acc_Z'].to_numpy(), fs, config.JERK_SMOOTHING)
+        return calculate_derivatives(df_butterworth)
+
+    return memoize('jerk', key, settings, compute, STAGE_VERSIONS['jerk'])
+
+def get_detector_columns() -> list[str]:
+    '''
+    Acceleration columns that must be Butterworth filtered for config.DETECTOR
+
+    Returns:
+        list[str]: ['Acc_Z'] for 'sd', the three axes for 'energy'
+    '''
+    return ['Acc_X', 'Acc_Y', 'Acc_Z'] if config.DETECTOR == 'energy' else ['Acc_Z']
+
+def get_detector_signal(df_butterworth: pd.DataFrame, jerk: NDArray[np.float64]) -> NDArray[np.float64]:
+    '''
+    Signal the detector and its threshold (set_jerk_threshold) work on: the jerk for 'sd', the
+    acceleration magnitude deviation (get_magnitude_deviation) for 'energy'
+    '''
+    if config.DETECTOR == 'energy':
+        return get_magnitude_deviation(df_butterworth)
+
+    return jerk
+
+def window_sd_stage(signal: NDArray[np.float64], key: str, window_size: int, step_size: int) -> tuple[list[float], str]:
+    '''
+    Window values of the detector, calculate_window_sd ('sd') or calculate_window_energy ('energy'), cached
+    '''
+    if config.DETECTOR not in DETECTORS:
+        raise ValueError(f'Unknown detector {config.DETECTOR!r}, expected one of {DETECTORS}')
+
+    def compute() -> list[float]:
+        if config.DETECTOR == 'energy':
+            return calculate_window_energy(signal, window_size, step_size)
+        return calculate_window_sd(signal, window_size, step_size)
+
+    return memoize('window_sd', key, {'DETECTOR': config.DETECTOR, 'window_size': window_size, 'step_size': step_size}, compute, STAGE_VERSIONS['window_sd'])
+
+def run_case(file_path: str) -> dict | None:
+    '''
+    Runs the analysis of one case up to the window SD (same steps and settings as main.py).
+    Each stage is memoized (see cache_helper.py)
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        dict | None: None if the case can not be read or its timestamps are rejected. Otherwise
+            'df_filtered' (initial filter output), 'df_butterworth' (timeStamp and the filtered
+            get_detector_columns, decimated), 'jerk', 'detector_signal' (get_detector_signal),
+            'sd_list' (window values of the detector), 'timestamp_report' and the 'fs', 'window_size',
+            'step_size' and 'decimation_factor' used after decimation
+    '''
+    # Invalid decimation settings stop here, before any work
+    decimation_factor: int = config.DECIMATION_FACTOR
+    window_size, step_size = get_decimated_windows(decimation_factor)
+
+    df, key = read_stage(file_path)
+    if df is None or df.empty:
+        return None
+
+    (df, timestamp_report), key = timestamps_stage(df, key)
+    if df is None:
+        return None
+
+    df_filtered, key = initial_filter_stage(df, key)
+    df_butterworth, key = butterworth_stage(df_filtered, key, get_detector_columns())
+
+    df_butterworth, key = decimation_stage(df_butterworth, key)
+
+    jerk, key = jerk_stage(df_butterworth, key, timestamp_report['uniform'])
+    detector_signal: NDArray[np.float64] = get_detector_signal(df_butterworth, jerk)
+    sd_list, _ = window_sd_stage(detector_signal, key, window_size, step_size)
+
+    return {
+        'df_filtered': df_filtered,
+        'df_butterworth': df_butterworth,
+        'jerk': jerk,
+        'detector_signal': detector_signal,
+        'sd_list': sd_list,
+        'timestamp_report': timestamp_report,
+        'fs': config.FS / decimation_factor,
+        'window_size': window_size,
+        'step_size': step_size,
+        'decimation_factor': decimation_factor,
+    }
+
+def detect_attempts(result: dict) -> dict:
+    '''
+    Continues the analysis of run_case: jerk threshold, ROIs, max accelerations per ROI and
+    recovery score (same steps as main.py, but the score is not logged)
+
+    Args:
+        result (dict): output of run_case
+
+    Returns:
+        dict: 'result' plus 'mean_jerk', 'std_jerk', 'jerk_threshold_cal', 'roi_sd', 'roi_indexes'
+            (original samples, only the ROIs found in df_filtered), 'extracted_roi', 'amax_x_list',
+            'amax_y_list', 'amax_z_list', 'number_failed_attempts', 'sa_2axes', 'sumua' and
+            'rs_2axes_py' (None if no ROI was detected)
+    '''
+    mean_jerk, std_jerk, jerk_threshold_cal = set_jerk_threshold(result['detector_signal'], config.FACTOR, config.PERCENTILE)
+    roi_sd: list = detect_roi_sd(result['sd_list'], jerk_threshold_cal)
+    roi_indexes: list[list[int]] = map_indexes_to_original(get_indexes(roi_sd, result['window_size'], result['step_size']), result['decimation_factor'])
+
+    # extract_accel_values_from_roi skips ROIs outside the DataFrame; keep the lists aligned
+    df_filtered: pd.DataFrame = result['df_filtered']
+    kept: list[int] = [i for i, idx in enumerate(roi_indexes) if idx[0] in df_filtered.index and idx[1] in df_filtered.index]
+    roi_sd = [roi_sd[i] for i in kept]
+    roi_indexes = [roi_indexes[i] for i in kept]
+    extracted_roi: list[pd.DataFrame] = extract_accel_values_from_roi(df_filtered, roi_indexes)
+    amax_x_list, amax_y_list, amax_z_list = get_max_accelerations(extracted_roi)
+
+    number_failed_attempts: int = get_attempts(roi_sd)
+    sa_2axes: float | None = get_sa_2axes(amax_x_list, amax_y_list) if roi_sd else None
+    sumua: float | None = get_sumua(amax_x_list, amax_y_list, amax_z_list) if roi_sd else None
+
+    return {
+        **result,
+        'mean_jerk': float(mean_jerk),
+        'std_jerk': float(std_jerk),
+        'jerk_threshold_cal': float(jerk_threshold_cal),
+        'roi_sd': roi_sd,
+        'roi_indexes': roi_indexes,
+        'extracted_roi': extracted_roi,
+        'amax_x_list': amax_x_list,
+        'amax_y_list': amax_y_list,
+        'amax_z_list': amax_z_list,
+        'number_failed_attempts': number_failed_attempts,
+        'sa_2axes': sa_2axes,
+        'sumua': sumua,
+        'rs_2axes_py': get_rs(number_failed_attempts, sa_2axes, sumua) if roi_sd else None,
+    }
@@ -0,0 +1,181 @@
+# Recovery Score Calculations: Profile helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: opt-in profiling of the analysis of one case ('--profile [--profiler name]' on main.py,
+# cohort_helper.py and export_helper.py). Two profilers:
+#   'cprofile'  deterministic (cProfile), writes <case>.prof (pstats, e.g. 'snakeviz <case>.prof')
+#   'sampling'  samples the stack of the profiled thread every PROFILE_INTERVAL seconds, writes
+#               <case>.collapsed (collapsed stacks, 'frame;frame;frame count') for flamegraph.pl
+#               or speedscope. Lower overhead, and shows where time goes inside long calls
+# The entry points only import this module when profiling is enabled and use a nullcontext
+# otherwise, so a normal run has no overhead. print_summary adds up the profiles of a batch
+# (also the ones written by worker processes) and prints the top functions by cumulative time.
+# Cached stages are loaded instead of computed (cache_helper.py); set CACHE_ENABLED = False to
+# profile the computation itself.
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+import config
+
+PROFILERS: list[str] = ['cprofile', 'sampling']
+EXTENSIONS: dict[str, str] = {'cprofile': '.prof', 'sampling': '.collapsed'}
+
+class SamplingProfiler:
+    '''
+    Counts the call stacks of one thread, sampled from a background thread
+    '''
+
+    def __init__(self, interval: float = config.PROFILE_INTERVAL) -> None:
+        self.interval: float = interval
+        self.stacks: Counter = Counter()
+        self._thread_id: int | None = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def start(self) -> None:
+        '''
+        Starts sampling the calling thread
+        '''
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target = self._run, daemon = True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        '''
+        Stops sampling
+        '''
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _run(self) -> None:
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack: list[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, file_path: str) -> None:
+        '''
+        Writes the stacks in the collapsed format, one 'frame;frame;frame count' line per stack
+        '''
+        with open(file_path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+def get_profile_path(name: str, profiler: str, output_dir: str = config.PROFILE_OUTPUT) -> str:
+    '''
+    Path of the profile of one case
+
+    Args:
+        name (str): case number (file_name), its folder is dropped
+        profiler (str): one of PROFILERS
+        output_dir (str): profiles folder
+
+    Returns:
+        str: path of the profile file
+    '''
+    return os.path.join(output_dir, os.path.basename(name) + EXTENSIONS[profiler])
+
+@contextmanager
+def profile_case(name: str, profiler: str = config.PROFILER, output_dir: str = config.PROFILE_OUTPUT) -> Iterator[None]:
+    '''
+    Profiles the code inside the with block and writes the profile of the case when it ends
+
+    Args:
+        name (str): case number (file_name)
+        profiler (str): one of PROFILERS
+        output_dir (str): profiles folder
+    '''
+    if profiler not in PROFILERS:
+        raise ValueError(f'Unknown profiler {profiler!r}, expected one of {PROFILERS}')
+
+    os.makedirs(output_dir, exist_ok = True)
+    profile_path: str = get_profile_path(name, profiler, output_dir)
+
+    if profiler == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(profile_path)
+
+    else:
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            sampler.write_collapsed(profile_path)
+
+    print(f'profile saved to {profile_path}')
+
+def get_top_functions(profile_paths: list[str], profiler: str, top: int = config.PROFILE_TOP) -> list[tuple[str, float, int]]:
+    '''
+    Adds up several profiles and returns the functions with the highest cumulative time
+
+    Args:
+        profile_paths (list[str]): profiles written by profile_case
+        profiler (str): profiler that wrote them
+        top (int): number of functions
+
+    Returns:
+        list[tuple[str, float, int]]: function, cumulative time (s) and number of calls ('cprofile')
+            or of samples ('sampling', the time is samples * PROFILE_INTERVAL)
+    '''
+    profile_paths = [path for path in profile_paths if os.path.exists(path)]
+    if not profile_paths:
+        return []
+
+    if profiler == 'cprofile':
+        stats = pstats.Stats(*profile_paths)
+        rows: list[tuple[str, float, int]] = [
+            (f'{function} ({os.path.basename(file_name)}:{line})', cumulative_time, calls)
+            for (file_name, line, function), (_, calls, _, cumulative_time, _) in stats.stats.items()
+        ]
+
+    else:
+        # A function counts once per sample it is on the stack of (inclusive time)
+        samples: Counter = Counter()
+        for path in profile_paths:
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    for frame in set(stack.split(';')):
+                        samples[frame] += int(count)
+        rows = [(frame, count * config.PROFILE_INTERVAL, count) for frame, count in samples.items()]
+
+    return sorted(rows, key = lambda row: row[1], reverse = True)[:top]
+
+def print_summary(names: list[str], profiler: str, output_dir: str = config.PROFILE_OUTPUT, top: int = config.PROFILE_TOP) -> None:
+    '''
+    Prints the top functions by cumulative time over the profiles of a batch of cases
+
+    Args:
+        names (list[str]): case numbers (file_names) profiled
+        profiler (str): profiler used
+        output_dir (str): profiles folder
+        top (int): number of functions
+    '''
+    rows: list[tuple[str, float, int]] = get_top_functions([get_profile_path(name, profiler, output_dir) for name in names], profiler, top)
+
+    print(f'top {len(rows)} functions by cumulative time ({len(names)} cases, {profiler}):')
+    for function, cumulative_time, count in rows:
+        print(f'{cumulative_time:10.3f} s {count:>10} {"calls" if profiler == "cprofile" else "samples"}  {function}')
@@ -0,0 +1,206 @@
+# Recovery Score Calculations: Pyramid helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: multi-resolution min/max pyramid of a signal for interactive review of long recordings.
+# Level L keeps the min and max of every PYRAMID_FACTOR ** L samples. When the plot is zoomed or
+# panned, each line is redrawn from the finest level that has at most PYRAMID_MAX_POINTS buckets in
+# the visible range, so the number of points drawn does not depend on the length of the recording.
+# Pyramids are stored next to the recording as <case>_<name>.pyr.npz
+
+import hashlib
+
+import numpy as np
+
+import config
+
+from numpy.typing import NDArray
+
+class SignalPyramid:
+    '''
+    Min/max pyramid of one or more signals sharing the same timestamps
+    '''
+
+    def __init__(self, time_ns: NDArray[np.int64], signals: dict[str, NDArray[np.float64]]) -> None:
+        self.time_ns: NDArray[np.int64] = time_ns
+        self.signals: dict[str, NDArray[np.float64]] = signals
+        # levels[L - 1] = (bucket start times, {name: (min, max)}) for level L
+        self.levels: list[tuple[NDArray[np.int64], dict[str, tuple[NDArray, NDArray]]]] = []
+
+    def build(self, factor: int = config.PYRAMID_FACTOR, min_buckets: int = config.PYRAMID_MAX_POINTS) -> None:
+        '''
+        Builds the levels. Each level is reduced from the previous one, so the whole pyramid
+        costs about one pass over the signal
+
+        Args:
+            factor (int): samples (or buckets of the previous level) per bucket
+            min_buckets (int): stop when a level has fewer buckets than this
+        '''
+        self.levels = []
+        time_ns: NDArray[np.int64] = self.time_ns
+        minmax: dict[str, tuple[NDArray, NDArray]] = {name: (signal, signal) for name, signal in self.signals.items()}
+
+        while len(time_ns) > min_buckets:
+            starts: NDArray[np.intp] = np.arange(0, len(time_ns), factor)
+            time_ns = time_ns[starts]
+            minmax = {name: (np.minimum.reduceat(lo, starts), np.maximum.reduceat(hi, starts)) for name, (lo, hi) in minmax.items()}
+            self.levels.append((time_ns, minmax))
+
+    def get_level(self, t_start: int, t_end: int, max_points: int = config.PYRAMID_MAX_POINTS) -> int:
+        '''
+        Finds the finest level with at most 'max_points' buckets between two times
+
+        Args:
+            t_start (int): start of the visible range (ns)
+            t_end (int): end of the visible range (ns)
+            max_points (int): max buckets (or samples for level 0) to draw per line
+
+        Returns:
+            int: level (0 is the original signal)
+        '''
+        for level in range(len(self.levels) + 1):
+            time_ns: NDArray[np.int64] = self.time_ns if level == 0 else self.levels[level - 1][0]
+            if np.searchsorted(time_ns, t_end) - np.searchsorted(time_ns, t_start) <= max_points:
+                return level
+
+        return len(self.levels)
+
+    def get_line_data(self, name: str, t_start: int, t_end: int, max_points: int = config.PYRAMID_MAX_POINTS) -> tuple[NDArray, NDArray]:
+        '''
+        Points to draw for one signal between two times. For levels above 0 each bucket is drawn
+        as a vertical segment from its min to its max, which keeps every peak visible
+
+        Args:
+            name (str): signal name
+            t_start (int): start of the visible range (ns)
+            t_end (int): end of the visible range (ns)
+            max_points (int): see get_level
+
+        Returns:
+            tuple[NDArray, NDArray]: timestamps (datetime64[ns]) and values
+        '''
+        level: int = self.get_level(t_start, t_end, max_points)
+
+        if level == 0:
+            time_ns, lo, hi = self.time_ns, self.signals[name], None
+        else:
+            time_ns = self.levels[level - 1][0]
+            lo, hi = self.levels[level - 1][1][name]
+
+        # One point beyond each side so the line reaches the edges of the plot
+        first: int = max(int(np.searchsorted(time_ns, t_start)) - 1, 0)
+        last: int = min(int(np.searchsorted(time_ns, t_end)) + 1, len(time_ns))
+        x: NDArray = time_ns[first:last]
+
+        if hi is None:
+            return x.astype('datetime64[ns]'), lo[first:last]
+
+        return np.repeat(x, 2).astype('datetime64[ns]'), np.column_stack((lo[first:last], hi[first:last])).ravel()
+
+    def get_signature(self) -> str:
+        '''
+        Fingerprint of the signals (length and a strided sample of the values), used to check
+        that a stored pyramid belongs to the same data
+        '''
+        digest = hashlib.sha1(str(len(self.time_ns)).encode())
+        digest.update(np.ascontiguousarray(self.time_ns[::config.PYRAMID_FACTOR ** 3]).tobytes())
+        for name in sorted(self.signals):
+            digest.update(np.ascontiguousarray(self.signals[name][::config.PYRAMID_FACTOR ** 3]).tobytes())
+
+        return digest.hexdigest()
+
+    def save(self, pyramid_path: str) -> None:
+        '''
+        Saves the levels (not the original signals) to a .npz file
+
+        Args:
+            pyramid_path (str): path of the file
+        '''
+        arrays: dict[str, NDArray] = {'signature': np.array(self.get_signature())}
+        for level, (time_ns, minmax) in enumerate(self.levels, start = 1):
+            arrays[f'L{level}_time'] = time_ns
+            for name, (lo, hi) in minmax.items():
+                arrays[f'L{level}_{name}_min'] = lo
+                arrays[f'L{level}_{name}_max'] = hi
+        np.savez(pyramid_path, **arrays)
+
+    def load(self, pyramid_path: str) -> bool:
+        '''
+        Loads the levels saved by 'save' if they were built from the same signals
+
+        Args:
+            pyramid_path (str): path of the file
+
+        Returns:
+            bool: True if the levels were loaded
+        '''
+        try:
+            with np.load(pyramid_path) as data:
+                if str(data['signature']) != self.get_signature():
+                    return False
+                n_levels: int = len([key for key in data.files if key.endswith('_time')])
+                self.levels = [
+                    (data[f'L{level}_time'], {name: (data[f'L{level}_{name}_min'], data[f'L{level}_{name}_max']) for name in self.signals})
+                    for level in range(1, n_levels + 1)
+                ]
+        except (OSError, KeyError, ValueError):
+            return False
+
+        return True
+
+def get_pyramid(file_path: str | None, name: str, time_ns: NDArray[np.int64], signals: dict[str, NDArray[np.float64]]) -> SignalPyramid:
+    '''
+    Loads the stored pyramid of a case, or builds it (and stores it if there is a case number)
+
+    Args:
+        file_path (str | None): case number (file_name) without extension
+        name (str): name of the signal set ('accel', 'jerk')
+        time_ns (NDArray[np.int64]): timestamps in ns
+        signals (dict[str, NDArray[np.float64]]): signals sharing those timestamps
+
+    Returns:
+        SignalPyramid
+    '''
+    pyramid = SignalPyramid(time_ns, signals)
+    pyramid_path: str | None = f'{file_path}_{name}{config.PYRAMID_EXTENSION}' if file_path else None
+
+    if pyramid_path is None or not pyramid.load(pyramid_path):
+        pyramid.build()
+        if pyramid_path is not None:
+            try:
+                pyramid.save(pyramid_path)
+            except OSError as e:
+                print('Pyramid could not be saved:', str(e))
+
+    return pyramid
+
+def plot_pyramid(ax, pyramid: SignalPyramid, styles: dict[str, dict]) -> list:
+    '''
+    Plots the signals of a pyramid and redraws them at the matching level when the x range changes
+
+    Args:
+        ax (matplotlib.axes.Axes): axes to draw on
+        pyramid (SignalPyramid): signals to draw
+        styles (dict[str, dict]): keyword arguments of ax.plot (label, color) for each signal
+
+    Returns:
+        list: the Line2D objects
+    '''
+    import matplotlib.dates as mdates
+
+    t_start, t_end = int(pyramid.time_ns[0]), int(pyramid.time_ns[-1])
+    lines: dict = {}
+    for name, style in styles.items():
+        x, y = pyramid.get_line_data(name, t_start, t_end)
+        lines[name], = ax.plot(x, y, **style)
+
+    def on_xlim_changed(axes) -> None:
+        x_min, x_max = axes.get_xlim()
+        # Axis limits are matplotlib date numbers (days since the epoch)
+        visible_start: int = np.datetime64(mdates.num2date(x_min).replace(tzinfo = None), 'ns').astype(np.int64)
+        visible_end: int = np.datetime64(mdates.num2date(x_max).replace(tzinfo = None), 'ns').astype(np.int64)
+        for name, line in lines.items():
+            line.set_data(*pyramid.get_line_data(name, visible_start, visible_end))
+
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
+
+    return list(lines.values())
@@ -0,0 +1,290 @@
+# Recovery Score Calculations: Recording helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: compact binary format (.rsb) for the logger recordings and converter from the logger csv.
+# Usage: python recording_helper.py <case numbers> [--int16] [--no-compress]
+#
+# File layout (little endian):
+#   header   magic 'RSB1', version, axis encoding, compression flag, chunk size, number of samples, index offset,
+#            size and modification time (ns) of the csv it was converted from, timestamps
+#            strictly increasing flag (so index_helper.get_repaired_case needs no full read to know it)
+#   chunks   first timestamp (int64 ns), timestamp deltas (int64 ns), Acc_X, Acc_Y, Acc_Z
+#            (float32, or int16 scaled by the chunk 'scale'). Each chunk is optionally zlib compressed
+#   index    one INDEX_DTYPE row per chunk (first sample, number of samples, first/last timestamp,
+#            byte offset, byte length, scale) so any sample or time range can be read without the rest
+# A recording is only used while its csv has the size and modification time stored in the header
+# (has_recording); once the csv is replaced or grows, the csv is read until it is converted again.
+
+import argparse
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from file_helper import add_csv_extension
+from numpy.typing import NDArray
+
+MAGIC: bytes = b'RSB1'
+VERSION: int = 2
+HEADER_FORMAT: str = '<4sHBBIQQQqB'  # magic, version, axis encoding, compressed, chunk size, n_samples, index offset, csv size, csv mtime (ns), increasing
+HEADER_SIZE: int = struct.calcsize(HEADER_FORMAT)
+AXIS_ENCODINGS: dict[str, int] = {'float32': 0, 'int16': 1}
+INDEX_DTYPE = np.dtype([
+    ('sample_start', '<u8'),
+    ('n', '<u4'),
+    ('first_ts', '<i8'),
+    ('last_ts', '<i8'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('scale', '<f8'),
+])
+
+def add_recording_extension(file_path: str) -> str:
+    '''
+    adds the binary recording extension (config.RECORDING_EXTENSION) to the file number
+
+    Args:
+        file_path (str): Case Number
+
+    Returns:
+        str: the Case Number (entered) plus the recording extension
+    '''
+    return file_path + config.RECORDING_EXTENSION
+
+def has_recording(file_path: str) -> bool:
+    '''
+    Checks if a case can be read from its binary recording: it exists and the logger csv (if there
+    is one) has not changed since it was converted
+
+    Args:
+        file_path (str): case number (file_name) without extension
+
+    Returns:
+        bool: True if the binary recording is up to date
+    '''
+    recording_path: str = add_recording_extension(file_path)
+    file_path_csv: str = add_csv_extension(file_path)
+    if not os.path.exists(recording_path):
+        return False
+    if not os.path.exists(file_path_csv):
+        return True
+
+    try:
+        header, _ = read_recording_index(recording_path)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(file_path_csv)
+
+    return header['source_size'] == stat.st_size and header['source_mtime_ns'] == stat.st_mtime_ns
+
+def encode_chunk(time_ns: NDArray[np.int64], accel: NDArray[np.float64], axis_encoding: str, compress: bool) -> tuple[bytes, float]:
+    '''
+    Encodes one chunk of samples
+
+    Args:
+        time_ns (NDArray[np.int64]): timestamps in ns
+        accel (NDArray[np.float64]): (n, 3) array with Acc_X, Acc_Y, Acc_Z
+        axis_encoding (str): 'float32' or 'int16'
+        compress (bool): zlib compress the chunk
+
+    Returns:
+        tuple[bytes, float]: encoded chunk and scale of the int16 values (1.0 for float32)
+    '''
+    scale: float = 1.0
+    if axis_encoding == 'int16':
+        peak: float = float(np.max(np.abs(accel))) if len(accel) else 0.0
+        scale = peak / 32767 if peak > 0 else 1.0
+        axes: NDArray = np.round(accel / scale).astype('<i2')
+    else:
+        axes = accel.astype('<f4')
+
+    timestamps: NDArray[np.int64] = np.diff(time_ns, prepend = 0).astype('<i8')  # first value is the timestamp itself
+    payload: bytes = timestamps.tobytes() + np.ascontiguousarray(axes.T).tobytes()
+
+    return (zlib.compress(payload, config.RECORDING_COMPRESSION_LEVEL) if compress else payload), scale
+
+def decode_chunk(payload: bytes, entry: np.void, axis_encoding: int, compressed: bool) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+    '''
+    Decodes one chunk of samples written by encode_chunk
+
+    Args:
+        payload (bytes): encoded chunk
+        entry (np.void): index row of the chunk
+        axis_encoding (int): value of AXIS_ENCODINGS
+        compressed (bool): chunk is zlib compressed
+
+    Returns:
+        tuple[NDArray[np.int64], NDArray[np.float64]]: timestamps in ns and (n, 3) accelerations
+    '''
+    if compressed:
+        payload = zlib.decompress(payload)
+
+    n: int = int(entry['n'])
+    time_ns: NDArray[np.int64] = np.cumsum(np.frombuffer(payload, dtype = '<i8', count = n))
+
+    if axis_encoding == AXIS_ENCODINGS['int16']:
+        axes = np.frombuffer(payload, dtype = '<i2', offset = 8 * n).reshape(3, n) * entry['scale']
+    else:
+        axes = np.frombuffer(payload, dtype = '<f4', offset = 8 * n).reshape(3, n)
+
+    return time_ns, axes.T.astype(np.float64)
+
+def convert_csv_to_recording(file_path: str, axis_encoding: str = config.RECORDING_AXIS_ENCODING, compress: bool = config.RECORDING_COMPRESS) -> str:
+    '''
+    Converts a logger csv (layout read by read_csv_file) into a binary recording.
+    The csv is read in chunks of config.RECORDING_CHUNK_SAMPLES rows so memory use does not
+    depend on the length of the recording
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        axis_encoding (str): 'float32' or 'int16'
+        compress (bool): zlib compress the chunks
+
+    Returns:
+        str: path of the binary recording
+    '''
+    recording_path: str = add_recording_extension(file_path)
+    index: list[tuple] = []
+    n_samples: int = 0
+    increasing: bool = True
+    last_ts: int | None = None
+    # Taken before reading: a csv that grows during the conversion leaves the recording out of date
+    stat = os.stat(add_csv_extension(file_path))
+
+    reader = pd.read_csv(
+        add_csv_extension(file_path),
+        skiprows = 3,
+        sep = ',',
+        header = None,
+        names = ['timeStamp', 'Acc_X', 'Acc_Y', 'Acc_Z'],
+        usecols = [0, 1, 2, 3],
+        dtype = {'timeStamp': str, 'Acc_X': float, 'Acc_Y': float, 'Acc_Z': float},
+        encoding = 'utf-8',
+        chunksize = config.RECORDING_CHUNK_SAMPLES,
+    )
+
+    with open(recording_path, 'wb') as f:
+        # Placeholder header, rewritten once the number of samples and the index offset are known
+        f.write(b'\0' * HEADER_SIZE)
+
+        for chunk in reader:
+            time_ns: NDArray[np.int64] = pd.to_datetime(chunk['timeStamp']).to_numpy(dtype = 'datetime64[ns]').astype(np.int64)
+            accel: NDArray[np.float64] = chunk[['Acc_X', 'Acc_Y', 'Acc_Z']].to_numpy(dtype = np.float64)
+
+            # Strictly increasing within the chunk and from the last sample of the previous chunk
+            increasing = increasing and bool(np.all(np.diff(time_ns) > 0)) and (last_ts is None or len(time_ns) == 0 or bool(time_ns[0] > last_ts))
+            if len(time_ns):
+                last_ts = int(time_ns[-1])
+
+            payload, scale = encode_chunk(time_ns, accel, axis_encoding, compress)
+            index.append((n_samples, len(chunk), time_ns[0], time_ns[-1], f.tell(), len(payload), scale))
+            f.write(payload)
+            n_samples += len(chunk)
+
+        index_offset: int = f.tell()
+        f.write(np.array(index, dtype = INDEX_DTYPE).tobytes())
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, AXIS_ENCODINGS[axis_encoding], compress, config.RECORDING_CHUNK_SAMPLES, n_samples, index_offset, stat.st_size, stat.st_mtime_ns, increasing))
+
+    return recording_path
+
+def read_recording_index(recording_path: str) -> tuple[dict, NDArray]:
+    '''
+    Reads the header and the chunk index of a binary recording
+
+    Args:
+        recording_path (str): path of the binary recording
+
+    Returns:
+        tuple[dict, NDArray]: header values and chunk index (INDEX_DTYPE). 'increasing' is True
+            if the timestamps are strictly increasing
+
+    Raises:
+        ValueError: if the file is not a version VERSION binary recording
+    '''
+    with open(recording_path, 'rb') as f:
+        data: bytes = f.read(HEADER_SIZE)
+        if len(data) < HEADER_SIZE or struct.unpack_from('<4sH', data) != (MAGIC, VERSION):
+            raise ValueError(f'{recording_path} is not a version {VERSION} binary recording')
+        _, _, axis_encoding, compressed, chunk_samples, n_samples, index_offset, source_size, source_mtime_ns, increasing = struct.unpack(HEADER_FORMAT, data)
+        f.seek(index_offset)
+        index: NDArray = np.frombuffer(f.read(), dtype = INDEX_DTYPE)
+
+    header: dict = {
+        'axis_encoding': axis_encoding,
+        'compressed': bool(compressed),
+        'chunk_samples': chunk_samples,
+        'n_samples': n_samples,
+        'source_size': source_size,
+        'source_mtime_ns': source_mtime_ns,
+        'increasing': bool(increasing),
+    }
+
+    return header, index
+
+def read_recording(file_path: str, start: int = 0, stop: int | None = None) -> pd.DataFrame:
+    '''
+    Reads samples start..stop (stop excluded) of a binary recording into the same DataFrame
+    that read_csv_file returns (timeStamp, Acc_X, Acc_Y, Acc_Z). Only the chunks that contain
+    the requested samples are read
+
+    Args:
+        file_path (str): case number (file_name) without extension
+        start (int): first sample
+        stop (int | None): sample after the last one. None reads until the end
+
+    Returns:
+        Pandas DataFrame
+    '''
+    recording_path: str = add_recording_extension(file_path)
+    header, index = read_recording_index(recording_path)
+    stop = header['n_samples'] if stop is None else min(stop, header['n_samples'])
+
+    chunk_end: NDArray = index['sample_start'] + index['n']
+    selected: NDArray = index[(chunk_end > start) & (index['sample_start'] < stop)]
+
+    times: list[NDArray[np.int64]] = []
+    accels: list[NDArray[np.float64]] = []
+    with open(recording_path, 'rb') as f:
+        for entry in selected:
+            f.seek(int(entry['offset']))
+            time_ns, accel = decode_chunk(f.read(int(entry['length'])), entry, header['axis_encoding'], header['compressed'])
+            times.append(time_ns)
+            accels.append(accel)
+
+    if not times:
+        return pd.DataFrame(columns = ['timeStamp', 'Acc_X', 'Acc_Y', 'Acc_Z'])
+
+    # Trim the first and last chunks to the requested samples
+    first_sample: int = int(selected['sample_start'][0])
+    first: int = max(start - first_sample, 0)
+    last: int = stop - first_sample
+    time_ns = np.concatenate(times)[first:last]
+    accel = np.concatenate(accels)[first:last]
+
+    return pd.DataFrame({
+        'timeStamp': time_ns.astype('datetime64[ns]'),
+        'Acc_X': accel[:, 0],
+        'Acc_Y': accel[:, 1],
+        'Acc_Z': accel[:, 2],
+    })
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description = 'Convert logger csv files to binary recordings')
+    parser.add_argument('cases', nargs = '+', help = 'case numbers (file names without .csv)')
+    parser.add_argument('--int16', dest = 'axis_encoding', action = 'store_const', const = 'int16', default = config.RECORDING_AXIS_ENCODING, help = 'store the axes as scaled int16 instead of float32')
+    parser.add_argument('--no-compress', dest = 'compress', action = 'store_false', default = config.RECORDING_COMPRESS, help = 'do not zlib compress the chunks')
+    args = parser.parse_args()
+
+    for case in args.cases:
+        recording_path: str = convert_csv_to_recording(case, args.axis_encoding, args.compress)
+        print(f'{add_csv_extension(case)} converted to {recording_path}')
+
+if __name__ == "__main__":
+
+    main()
@@ -1,6 +1,6 @@
 # Recovery Score Calculations: recovery score calculator
 # Script created 5/29/2024
-# Last revision 5/23/2025
+# Last revision 10/19/2026
 
 import numpy as np
 
@@ -35,4 +35,23 @@ def get_rs_ua(sa_2axes: float, sumua: float) -> float:
 
     recovery_score_ua: float = 7.0312 * np.power(sumua, 0.278)
 
-    return recovery_score_ua
\ No newline at end of file
+    return recovery_score_ua
+
+def get_rs(number_failed_attempts: int, sa_2axes: float, sumua: float) -> float:
+    '''
+    Calculates the Recovery Score as process_recovery does, without logging it:
+    UA formula if there was at least one failed attempt, SA formula otherwise.
+
+    Args:
+        number_failed_attempts (int): number of failed attempts
+        sa_2axes (float): numerical value for the SA Recovery Score
+        sumua (float): numerical value for the UA Recovery Score
+
+    Returns:
+        float: Recovery Score
+    '''
+
+    if number_failed_attempts >= 1:
+        return get_rs_ua(sa_2axes, sumua)
+
+    return get_rs_sa(sa_2axes)
@@ -0,0 +1,158 @@
+# Recovery Score Calculations: Statistics helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: mergeable summaries used when the jerk signal is not available as one array
+# (streams processed block by block). Both classes can be updated with any number of
+# blocks, or merged with each other, and give the same result as one pass over all the data.
+
+import numpy as np
+
+from numpy.typing import NDArray
+
+class RunningStats:
+    '''
+    Count, mean and sum of squared differences (M2) of a signal, updated block by block
+    (Welford / Chan et al. parallel algorithm)
+    '''
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+
+    def update(self, values: NDArray[np.float64]) -> None:
+        '''
+        Adds a block of values to the summary
+
+        Args:
+            values (NDArray[np.float64]): block of values
+        '''
+        values = np.asarray(values, dtype = np.float64)
+        if len(values) == 0:
+            return
+
+        block = RunningStats()
+        block.count = len(values)
+        block.mean = float(np.mean(values))
+        block.m2 = float(np.sum((values - block.mean) ** 2))
+        self.merge(block)
+
+    def merge(self, other: 'RunningStats') -> None:
+        '''
+        Combines another summary into this one
+
+        Args:
+            other (RunningStats): summary of a different block of values
+        '''
+        if other.count == 0:
+            return
+
+        count: int = self.count + other.count
+        delta: float = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+    @property
+    def std(self) -> float:
+        '''
+        Population standard deviation (same as np.std)
+        '''
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+
+class QuantileSketch:
+    '''
+    Log-bucketed histogram of a signal (DDSketch). Every value is counted in a bucket whose
+    bounds are within 'relative_accuracy' of each other, so any quantile can be estimated with
+    that relative error using a number of buckets that only depends on the dynamic range of the data
+    '''
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy: float = relative_accuracy
+        self.gamma: float = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma: float = float(np.log(self.gamma))
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}
+        self.zero_count: int = 0
+        self.count: int = 0
+
+    def update(self, values: NDArray[np.float64]) -> None:
+        '''
+        Adds a block of values to the sketch
+
+        Args:
+            values (NDArray[np.float64]): block of values
+        '''
+        values = np.asarray(values, dtype = np.float64)
+        self.count += len(values)
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self._add(self.positive, values[values > 0])
+        self._add(self.negative, -values[values < 0])
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        '''
+        Combines another sketch (built with the same relative accuracy) into this one
+
+        Args:
+            other (QuantileSketch): sketch of a different block of values
+        '''
+        if other.gamma != self.gamma:
+            raise ValueError('Sketches must have the same relative accuracy to be merged')
+
+        for key, n in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + n
+        for key, n in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def percentile(self, percentile: float) -> float:
+        '''
+        Estimates a percentile of all the values added so far
+
+        Args:
+            percentile (float): percentile between 0 and 100 (same convention as np.percentile)
+
+        Returns:
+            float: estimated value
+        '''
+        if self.count == 0:
+            return float('nan')
+
+        rank: float = percentile / 100 * (self.count - 1)
+        seen: int = 0
+
+        # Walk the buckets from the most negative to the most positive value
+        for key in sorted(self.negative, reverse = True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+
+        return self._value(max(self.positive))
+
+    def _add(self, buckets: dict[int, int], magnitudes: NDArray[np.float64]) -> None:
+        '''
+        Counts positive magnitudes into their buckets
+        '''
+        if len(magnitudes) == 0:
+            return
+
+        keys: NDArray[np.int64] = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+        unique_keys, counts = np.unique(keys, return_counts = True)
+        for key, n in zip(unique_keys.tolist(), counts.tolist()):
+            buckets[key] = buckets.get(key, 0) + n
+
+    def _value(self, key: int) -> float:
+        '''
+        Representative value of a bucket (relative error <= relative_accuracy)
+        '''
+        return float(2 * self.gamma ** key / (self.gamma + 1))
@@ -0,0 +1,388 @@
+# Recovery Score Calculations: Stream helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: asyncio ingest of several sample streams at once (one per recovery stall).
+# Each stream keeps its own incremental state (initial filter, Butterworth filter state,
+# last sample for the jerk, window SD buffer) and the CPU work for each block of samples
+# is run in an executor so that a busy stream never stalls the others.
+# Sources: 'tcp://host:port', 'unix:///path/to/socket', FIFOs or (tailed) csv files.
+# Usage: python stream_helper.py case1.csv tcp://localhost:9000 --follow
+#
+# Differences with the batch analysis (main.py):
+# - the Butterworth filter is causal (sosfilt), filtfilt needs the whole recording. The filter,
+#   jerk and window SD run in one fused pass per block with Numba, in separate passes without it
+#   (kernel_helper.py)
+# - 'attempt' events are emitted with the threshold calibrated on the jerk seen so far.
+#   The final ROIs and recovery score use the threshold calibrated on the whole stream
+
+import argparse
+import asyncio
+import os
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterator
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from acceleration_helper import get_sa_2axes, get_sumua
+from attempt_detection_helper import detect_roi_sd, get_attempts
+from kernel_helper import ZAxisKernel
+from numpy.typing import NDArray
+from recovery_score_helper import get_rs
+from stats_helper import QuantileSketch, RunningStats
+
+class StreamState:
+    '''
+    Incremental version of the analysis pipeline for one stream of samples
+    '''
+
+    def __init__(self, name: str) -> None:
+        from scipy.signal import butter
+
+        self.name: str = name
+        self.sos: NDArray[np.float64] = butter(config.BUTTERWORTH_ORDER, config.BUTTERWORTH_CUTOFF / (0.5 * config.FS), btype = 'lowpass', output = 'sos')
+        self.kernel: ZAxisKernel = ZAxisKernel(self.sos)  # filter state, last sample for the jerk, jerk not yet in a full window
+        self.started: bool = False  # True once Acc_Z went above config.TARGET_VALUE (initial_filter)
+        self.last_t: int | None = None  # timestamp (ns) of the last accepted sample
+        self.samples_dropped: int = 0  # samples with a timestamp that is not strictly increasing
+
+        # Samples not yet covered by a full window. The first jerk value buffered by the kernel is the
+        # jerk between raw samples raw_buffer[0] and raw_buffer[1]. All start at sample number
+        # 'n_windows * STEP_SIZE'
+        self.raw_buffer: NDArray[np.float64] = np.empty((0, 3))
+        self.time_buffer: NDArray[np.int64] = np.empty(0, dtype = np.int64)
+
+        self.jerk_stats: RunningStats = RunningStats()
+        self.jerk_sketch: QuantileSketch = QuantileSketch()
+        self.window_sd: list[float] = []
+        self.window_amax: list[tuple[float, float, float]] = []  # max |Acc_X|, |Acc_Y|, |Acc_Z| per window
+
+    @property
+    def jerk_threshold_cal(self) -> float:
+        '''
+        Same calibration as set_jerk_threshold, using the running mean/SD and percentile sketch
+        '''
+        return max(self.jerk_stats.mean + config.FACTOR * self.jerk_stats.std, self.jerk_sketch.percentile(config.PERCENTILE))
+
+    def process_lines(self, lines: list[str]) -> list[dict]:
+        '''
+        Parses csv lines (timeStamp, Acc_X, Acc_Y, Acc_Z, ...) and processes them.
+        Lines that can not be parsed (headers, units, partial lines) are ignored
+
+        Args:
+            lines (list[str]): lines of the logger csv
+
+        Returns:
+            list[dict]: 'attempt' events for the windows completed by these samples
+        '''
+        rows: list[list[str]] = [line.split(',')[:4] for line in lines]
+        rows = [row for row in rows if len(row) == 4]
+        if not rows:
+            return []
+
+        df = pd.DataFrame(rows, columns = ['timeStamp', 'Acc_X', 'Acc_Y', 'Acc_Z'])
+        for column in ['Acc_X', 'Acc_Y', 'Acc_Z']:
+            df[column] = pd.to_numeric(df[column], errors = 'coerce')
+        # Header and unit rows have no numeric values; dropping them first lets pandas infer the timestamp format
+        df = df.dropna()
+        df['timeStamp'] = pd.to_datetime(df['timeStamp'], errors = 'coerce')
+        df = df.dropna()
+
+        return self.process_block(
+            df['timeStamp'].to_numpy(dtype = 'datetime64[ns]').astype(np.int64),
+            df[['Acc_X', 'Acc_Y', 'Acc_Z']].to_numpy(dtype = np.float64),
+        )
+
+    def process_block(self, time_ns: NDArray[np.int64], accel: NDArray[np.float64]) -> list[dict]:
+        '''
+        Runs a block of samples through the initial filter, Butterworth filter, jerk and window SD
+
+        Args:
+            time_ns (NDArray[np.int64]): timestamps in ns
+            accel (NDArray[np.float64]): (n, 3) array with Acc_X, Acc_Y, Acc_Z
+
+        Returns:
+            list[dict]: 'attempt' events for the windows completed by this block
+        '''
+        # Initial filter: ignore everything until Acc_Z goes above TARGET_VALUE
+        if not self.started:
+            above: NDArray[np.intp] = np.flatnonzero(accel[:, 2] > config.TARGET_VALUE)
+            if len(above) == 0:
+                return []
+            self.started = True
+            time_ns, accel = time_ns[above[0]:], accel[above[0]:]
+
+        # Timestamps must be strictly increasing for the jerk (see calculate_derivatives)
+        previous: NDArray[np.int64] = np.maximum.accumulate(np.concatenate(([self.last_t if self.last_t is not None else time_ns[0] - 1], time_ns)))[:-1]
+        increasing: NDArray[np.bool_] = time_ns > previous
+        self.samples_dropped += int(len(time_ns) - np.count_nonzero(increasing))
+        time_ns, accel = time_ns[increasing], accel[increasing]
+        if len(time_ns) == 0:
+            return []
+
+        # Causal Butterworth filter on Acc_Z (steady state on the first sample), jerk (m/s^3)
+        # including the difference with the last sample of the previous block, buffered for the windows
+        jerk: NDArray[np.float64] = self.kernel.process(time_ns, accel[:, 2])
+        self.last_t = int(time_ns[-1])
+
+        self.jerk_stats.update(jerk)
+        self.jerk_sketch.update(jerk)
+        self.raw_buffer = np.concatenate((self.raw_buffer, accel))
+        self.time_buffer = np.concatenate((self.time_buffer, time_ns))
+
+        return self._process_windows()
+
+    def _process_windows(self) -> list[dict]:
+        '''
+        Calculates the SD (calculate_window_sd) and the max accelerations of every complete window
+        in the buffers, then drops the samples that no later window needs
+        '''
+        window: int = config.WINDOW_SIZE
+        step: int = config.STEP_SIZE
+        sd: NDArray[np.float64] = self.kernel.get_window_sd()
+        n_new: int = len(sd)
+        if n_new == 0:
+            return []
+
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        # Raw rows start .. start + window (inclusive, as extract_accel_values_from_roi)
+        amax: NDArray[np.float64] = sliding_window_view(np.abs(self.raw_buffer), window + 1, axis = 0)[::step][:n_new].max(axis = 2)
+
+        threshold: float = self.jerk_threshold_cal
+        events: list[dict] = []
+        for k in range(n_new):
+            index: int = len(self.window_sd)
+            self.window_sd.append(float(sd[k]))
+            self.window_amax.append((float(amax[k, 0]), float(amax[k, 1]), float(amax[k, 2])))
+            if sd[k] > threshold:
+                events.append({
+                    'stream': self.name,
+                    'event': 'attempt',
+                    'window': index,
+                    'start_index': index * step,
+                    'timeStamp': pd.Timestamp(int(self.time_buffer[k * step])),
+                    'sd': float(sd[k]),
+                    'jerk_threshold_cal': threshold,
+                })
+
+        consumed: int = n_new * step
+        self.raw_buffer = self.raw_buffer[consumed:]
+        self.time_buffer = self.time_buffer[consumed:]
+
+        return events
+
+    def finalize(self) -> dict:
+        '''
+        Detects the ROIs with the threshold calibrated on the whole stream and calculates
+        the values needed for the recovery score (as main.py does)
+
+        Returns:
+            dict: 'recovery_score' event. 'sa_2axes' is None if no ROI was detected
+        '''
+        jerk_threshold_cal: float = self.jerk_threshold_cal
+        roi_sd: list = detect_roi_sd(self.window_sd, jerk_threshold_cal)
+        amax_x_list: list[float] = [self.window_amax[i][0] for i, _ in roi_sd]
+        amax_y_list: list[float] = [self.window_amax[i][1] for i, _ in roi_sd]
+        amax_z_list: list[float] = [self.window_amax[i][2] for i, _ in roi_sd]
+
+        return {
+            'stream': self.name,
+            'event': 'recovery_score',
+            'mean_jerk': self.jerk_stats.mean,
+            'std_jerk': self.jerk_stats.std,
+            'jerk_threshold_cal': jerk_threshold_cal,
+            'roi_sd': roi_sd,
+            'number_failed_attempts': get_attempts(roi_sd),
+            'sa_2axes': get_sa_2axes(amax_x_list, amax_y_list) if roi_sd else None,
+            'sumua': get_sumua(amax_x_list, amax_y_list, amax_z_list) if roi_sd else None,
+            'samples_dropped': self.samples_dropped,
+        }
+
+async def read_source(source: str, follow: bool = False) -> AsyncIterator[bytes]:
+    '''
+    Reads raw bytes from a source until it ends
+
+    Args:
+        source (str): 'tcp://host:port', 'unix:///path' or the path of a FIFO / file
+        follow (bool): for regular files, keep reading data appended to the file until
+            it has not grown for config.STREAM_IDLE_TIMEOUT seconds
+
+    Yields:
+        bytes: chunks of data as they arrive
+    '''
+    loop = asyncio.get_running_loop()
+
+    if source.startswith(('tcp://', 'unix://')):
+        if source.startswith('tcp://'):
+            host, port = source[len('tcp://'):].rsplit(':', 1)
+            reader, writer = await asyncio.open_connection(host, int(port))
+        else:
+            reader, writer = await asyncio.open_unix_connection(source[len('unix://'):])
+        try:
+            while chunk := await reader.read(65536):
+                yield chunk
+        finally:
+            writer.close()
+        return
+
+    # open() of a FIFO blocks until a writer connects, so it runs in the default executor
+    f = await loop.run_in_executor(None, open, source, 'rb')
+    try:
+        idle: float = 0.0
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, 65536)
+            if chunk:
+                idle = 0.0
+                yield chunk
+            elif follow and idle < config.STREAM_IDLE_TIMEOUT:
+                await asyncio.sleep(config.STREAM_POLL_INTERVAL)
+                idle += config.STREAM_POLL_INTERVAL
+            else:
+                return
+    finally:
+        f.close()
+
+async def read_lines(source: str, follow: bool = False) -> AsyncIterator[list[str]]:
+    '''
+    Groups the data of a source into blocks of complete lines
+
+    Args:
+        source (str): see read_source
+        follow (bool): see read_source
+
+    Yields:
+        list[str]: about config.STREAM_BLOCK_SAMPLES lines (fewer when the source is slow)
+    '''
+    pending: bytes = b''
+    lines: list[str] = []
+
+    async for chunk in read_source(source, follow):
+        pending += chunk
+        *complete, pending = pending.split(b'\n')
+        lines.extend(line.decode('utf-8', errors = 'replace') for line in complete)
+        if len(lines) >= config.STREAM_BLOCK_SAMPLES:
+            yield lines
+            lines = []
+
+    if pending:
+        lines.append(pending.decode('utf-8', errors = 'replace'))
+    if lines:
+        yield lines
+
+def get_stream_name(source: str) -> str:
+    '''
+    Case number for a source: the file name without the .csv extension, or the address itself
+    '''
+    if source.startswith(('tcp://', 'unix://')):
+        return source
+
+    return os.path.splitext(os.path.basename(source))[0]
+
+async def ingest_stream(source: str, queue: asyncio.Queue, executor: Executor, follow: bool = False) -> None:
+    '''
+    Reads one stream, processes each block in the executor and puts the events in the queue
+
+    Args:
+        source (str): see read_source
+        queue (asyncio.Queue): queue receiving the 'attempt' and 'recovery_score' events
+        executor (Executor): executor for the CPU work
+        follow (bool): see read_source
+    '''
+    loop = asyncio.get_running_loop()
+    state = StreamState(get_stream_name(source))
+
+    try:
+        async for lines in read_lines(source, follow):
+            for event in await loop.run_in_executor(executor, state.process_lines, lines):
+                await queue.put(event)
+        await queue.put(await loop.run_in_executor(executor, state.finalize))
+
+    except Exception as e:
+        # Every stream ends with an event, otherwise run_streams would wait for it forever
+        await queue.put({'stream': state.name, 'event': 'error', 'error': f'{type(e).__name__}: {e}'})
+
+def score_event(event: dict, save: bool = True) -> dict:
+    '''
+    Adds the recovery score to a 'recovery_score' event (StreamState.finalize)
+
+    Args:
+        event (dict): event returned by StreamState.finalize
+        save (bool): add the score to the results csv (process_recovery)
+
+    Returns:
+        dict: the event with 'rs_2axes_py' (not added if no ROI was detected)
+    '''
+    if event['event'] == 'recovery_score' and event['sa_2axes'] is not None:
+        if save:
+            from output_results_helper import process_recovery
+
+            # The streaming kernel always works on the jerk (SD detector)
+            event['rs_2axes_py'] = process_recovery(
+                event['stream'], config.JERK_THRESHOLD, event['mean_jerk'], event['std_jerk'],
+                event['jerk_threshold_cal'], event['number_failed_attempts'], event['sa_2axes'], event['sumua'], 'sd',
+            )
+        else:
+            event['rs_2axes_py'] = get_rs(event['number_failed_attempts'], event['sa_2axes'], event['sumua'])
+
+    return event
+
+def print_event(event: dict) -> None:
+    '''
+    Prints an event of a stream
+    '''
+    if event['event'] == 'attempt':
+        print(f"[{event['stream']}] attempt at {event['timeStamp']} (window {event['window']}, sd = {event['sd']:.3e})")
+    else:
+        print(f"[{event['stream']}] {event['event']}: { {k: v for k, v in event.items() if k not in ('stream', 'event', 'roi_sd')} }")
+
+async def run_streams(sources: list[str], follow: bool = False, save: bool = True) -> list[dict]:
+    '''
+    Ingests several streams concurrently, prints their events and saves the recovery scores
+
+    Args:
+        sources (list[str]): see read_source
+        follow (bool): see read_source
+        save (bool): add the recovery score of each stream to the results csv (process_recovery)
+
+    Returns:
+        list[dict]: 'recovery_score' (or 'error') event of each stream
+    '''
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    results: list[dict] = []
+
+    with ThreadPoolExecutor(max_workers = config.STREAM_WORKERS) as executor:
+        tasks = [asyncio.create_task(ingest_stream(source, queue, executor, follow)) for source in sources]
+
+        while len(results) < len(tasks):
+            event: dict = await queue.get()
+
+            if event['event'] == 'attempt':
+                print_event(event)
+                continue
+
+            event = await loop.run_in_executor(None, score_event, event, save)
+            print_event(event)
+            results.append(event)
+
+        await asyncio.gather(*tasks)
+
+    return results
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description = 'Concurrent ingest of sensor streams')
+    parser.add_argument('sources', nargs = '+', help = "tcp://host:port, unix:///path, FIFO or csv file")
+    parser.add_argument('--follow', action = 'store_true', help = 'tail csv files that are still being written')
+    parser.add_argument('--no-save', dest = 'save', action = 'store_false', help = 'do not add the scores to the results csv')
+    args = parser.parse_args()
+
+    asyncio.run(run_streams(args.sources, args.follow, args.save))
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,190 @@
+# Recovery Score Calculations: Timestamp helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: checks and repairs the timestamps right after reading a case, so duplicated or
+# out-of-order samples are handled before the filters instead of stopping calculate_derivatives
+# at the end of the run. All the checks are vectorized (one np.diff over the timestamps).
+# A repaired DataFrame keeps the source sample number (row of the csv data) of each of its rows
+# as its index, so ROI indexes counted on it can be mapped back to the file (index_helper.py).
+# Out-of-order samples are dropped against their neighbours (get_in_order), so a single glitched
+# timestamp far in the future costs one sample and not every sample recorded after it.
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from bisect import bisect_right
+from numpy.typing import NDArray
+
+POLICIES: list[str] = ['reject', 'drop', 'average', 'resample']
+
+def check_timestamps(time_ns: NDArray[np.int64], fs: float, gap_factor: float, tolerance: float) -> dict:
+    '''
+    Counts duplicated, reversed (out-of-order) and missing samples
+
+    Args:
+        time_ns (NDArray[np.int64]): timestamps in ns
+        fs (float): expected sampling frequency (Hz)
+        gap_factor (float): an interval longer than gap_factor sampling periods is a gap
+        tolerance (float): max relative deviation from the sampling period for 'uniform' sampling
+
+    Returns:
+        dict: 'duplicates', 'reversals', 'gaps' and 'uniform' (every interval is one sampling period)
+    '''
+    period: float = 1e9 / fs
+    dt: NDArray[np.int64] = np.diff(time_ns)
+
+    return {
+        'duplicates': int(np.count_nonzero(dt == 0)),
+        'reversals': int(np.count_nonzero(dt < 0)),
+        'gaps': int(np.count_nonzero(dt > gap_factor * period)),
+        'uniform': bool(len(dt) > 0 and np.all(np.abs(dt - period) <= tolerance * period)),
+    }
+
+def get_longest_run(time_ns: NDArray[np.int64]) -> NDArray[np.bool_]:
+    '''
+    Longest non-decreasing subsequence of the timestamps (patience sorting, O(n log n))
+
+    Args:
+        time_ns (NDArray[np.int64]): timestamps in ns
+
+    Returns:
+        NDArray[np.bool_]: True for the samples of the subsequence
+    '''
+    tails: list[int] = []  # smallest last timestamp of a run of each length
+    tail_positions: list[int] = []
+    previous: NDArray[np.intp] = np.full(len(time_ns), -1, dtype = np.intp)
+
+    for i, t in enumerate(time_ns.tolist()):
+        length: int = bisect_right(tails, t)
+        if length:
+            previous[i] = tail_positions[length - 1]
+        if length == len(tails):
+            tails.append(t)
+            tail_positions.append(i)
+        else:
+            tails[length] = t
+            tail_positions[length] = i
+
+    in_order = np.zeros(len(time_ns), dtype = bool)
+    i = tail_positions[-1] if tail_positions else -1
+    while i >= 0:
+        in_order[i] = True
+        i = previous[i]
+
+    return in_order
+
+def get_in_order(time_ns: NDArray[np.int64], passes: int = config.TIMESTAMP_OUTLIER_PASSES) -> NDArray[np.bool_]:
+    '''
+    Samples to keep so that the timestamps never go backwards. At every reversal the sample that
+    breaks the order against its neighbours is dropped: the earlier one if it is later than the
+    sample after the reversal (a timestamp glitched forward), else the later one (glitched back).
+    Reversals still left after 'passes' passes (e.g. a block of samples written out of order) are
+    resolved by keeping the longest non-decreasing run (get_longest_run)
+
+    Args:
+        time_ns (NDArray[np.int64]): timestamps in ns
+        passes (int): max number of vectorized passes
+
+    Returns:
+        NDArray[np.bool_]: True for the samples kept
+    '''
+    in_order = np.ones(len(time_ns), dtype = bool)
+
+    for _ in range(passes):
+        kept: NDArray[np.intp] = np.flatnonzero(in_order)
+        t: NDArray[np.int64] = time_ns[kept]
+        reversed_at: NDArray[np.intp] = np.flatnonzero(np.diff(t) < 0)
+        if not len(reversed_at):
+            return in_order
+        before: NDArray[np.int64] = t[np.maximum(reversed_at - 1, 0)]
+        forward: NDArray[np.bool_] = (reversed_at == 0) | (before <= t[reversed_at + 1])
+        in_order[kept[np.where(forward, reversed_at, reversed_at + 1)]] = False
+
+    kept = np.flatnonzero(in_order)
+    if np.any(np.diff(time_ns[kept]) < 0):
+        in_order[kept[~get_longest_run(time_ns[kept])]] = False
+
+    return in_order
+
+def validate_timestamps(df: pd.DataFrame, policy: str = config.TIMESTAMP_POLICY, fs: float = config.FS) -> tuple[pd.DataFrame | None, dict]:
+    '''
+    Checks the timestamps of a case and repairs them according to 'policy':
+        'reject'   returns None if there are duplicated or reversed timestamps
+        'drop'     drops the out-of-order samples (get_in_order) and all but the first sample of
+                   each duplicated timestamp
+        'average'  as 'drop' for reversed samples, but duplicated timestamps are merged into
+                   one sample with the mean of their accelerations
+        'resample' as 'average', then interpolates the accelerations onto a uniform grid at 'fs'
+                   (gaps are filled linearly)
+    Whatever the policy, the case is rejected if fewer than config.TIMESTAMP_MIN_KEPT of its
+    samples are in order, as the recording itself is then not usable
+
+    Args:
+        df (pd.DataFrame): DataFrame returned by read_case_file
+        policy (str): one of POLICIES
+        fs (float): sampling frequency (Hz)
+
+    Returns:
+        tuple[pd.DataFrame | None, dict]: repaired DataFrame (None if rejected) and a report with the
+            counts found in the input, the policy, the number of samples kept, whether the samples
+            were 'repaired' and whether the output is uniformly sampled at 'fs'. The index of a
+            repaired DataFrame is the source sample number of each row (for 'resample', the last
+            sample at or before the grid point); otherwise 'df' is returned as it is
+    '''
+    if policy not in POLICIES:
+        raise ValueError(f'Unknown timestamp policy {policy!r}, expected one of {POLICIES}')
+
+    time_ns: NDArray[np.int64] = df['timeStamp'].to_numpy(dtype = 'datetime64[ns]').astype(np.int64)
+    report: dict = check_timestamps(time_ns, fs, config.TIMESTAMP_GAP_FACTOR, config.TIMESTAMP_TOLERANCE)
+    report.update({'policy': policy, 'samples_in': len(df)})
+
+    if len(df) < 2 or policy == 'reject' or (report['duplicates'] == 0 and report['reversals'] == 0 and (policy != 'resample' or report['uniform'])):
+        rejected: bool = policy == 'reject' and (report['duplicates'] > 0 or report['reversals'] > 0)
+        report.update({'samples_out': 0 if rejected else len(df), 'rejected': rejected, 'repaired': False})
+        return (None if rejected else df), report
+
+    accel: NDArray[np.float64] = df[['Acc_X', 'Acc_Y', 'Acc_Z']].to_numpy(dtype = np.float64)
+
+    # Reversed samples: drop the samples that break the order against their neighbours
+    in_order: NDArray[np.bool_] = get_in_order(time_ns) if report['reversals'] else np.ones(len(time_ns), dtype = bool)
+    report['samples_in_order'] = int(np.count_nonzero(in_order))
+    if report['samples_in_order'] < config.TIMESTAMP_MIN_KEPT * len(df):
+        print(f"Only {report['samples_in_order']} of {len(df)} samples are in order, the case is rejected")
+        report.update({'samples_out': 0, 'rejected': True, 'repaired': False})
+        return None, report
+
+    time_ns, accel = time_ns[in_order], accel[in_order]
+    source: NDArray[np.int64] = np.flatnonzero(in_order)
+
+    # Duplicated timestamps (now consecutive): keep the first sample or the mean of the group
+    group_starts: NDArray[np.intp] = np.flatnonzero(np.diff(time_ns, prepend = time_ns[0] - 1) != 0)
+    if policy == 'drop':
+        accel = accel[group_starts]
+    else:
+        accel = np.add.reduceat(accel, group_starts, axis = 0) / np.diff(np.append(group_starts, len(time_ns)))[:, None]
+    time_ns, source = time_ns[group_starts], source[group_starts]
+
+    if policy == 'resample':
+        period: float = 1e9 / fs
+        grid: NDArray[np.int64] = time_ns[0] + np.round(np.arange(int((time_ns[-1] - time_ns[0]) // period) + 1) * period).astype(np.int64)
+        # Relative times keep the interpolation exact (ns since the epoch do not fit in a float64)
+        accel = np.column_stack([np.interp(grid - time_ns[0], time_ns - time_ns[0], accel[:, axis]) for axis in range(3)])
+        source = source[np.searchsorted(time_ns, grid, side = 'right') - 1]
+        time_ns = grid
+
+    df_repaired = pd.DataFrame({
+        'timeStamp': time_ns.astype('datetime64[ns]'),
+        'Acc_X': accel[:, 0],
+        'Acc_Y': accel[:, 1],
+        'Acc_Z': accel[:, 2],
+    }, index = pd.Index(source, dtype = np.int64))
+    report.update({
+        'samples_out': len(df_repaired),
+        'rejected': False,
+        'repaired': True,
+        'uniform': check_timestamps(time_ns, fs, config.TIMESTAMP_GAP_FACTOR, config.TIMESTAMP_TOLERANCE)['uniform'],
+    })
+
+    return df_repaired, report
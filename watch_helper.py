@@ -0,0 +1,274 @@
+# Recovery Score Calculations: Watch helper
+# Script created 10/19/2026
+# Last revision 10/19/2026
+# Notes: watches the folder the loggers upload to and scores every case csv as it arrives.
+# Every WATCH_POLL_INTERVAL seconds the csv files are checked; only the bytes appended since the
+# last poll are read and run through the incremental analysis (stream_helper.StreamState).
+# A case is finalized (score saved with process_recovery) once its file has not grown for
+# WATCH_SETTLE_TIME seconds. A file that grows again later is continued and scored again.
+# Per-file checkpoints (byte offset, partial last line, StreamState with the filter state, window
+# accumulators and window SDs) are written to WATCH_CHECKPOINT_DIR after every read, so a
+# restarted watcher resumes where it stopped without reading any file from the start.
+# A file replaced by another one (new inode, different first WATCH_HEAD_BYTES, shorter, or modified
+# without growing) is read again from the start (is_replaced).
+# As in stream_helper.py the Butterworth filter is causal, so scores can differ slightly from main.py.
+# Usage: python watch_helper.py <folder> [--once] [--no-save] [--checkpoints folder]
+
+import argparse
+import copy
+import hashlib
+import os
+import pickle
+import time
+
+import config
+
+from CSV_helper import CSV
+from stream_helper import StreamState, print_event, score_event
+
+def get_checkpoint_path(file_path: str, checkpoint_dir: str) -> str:
+    '''
+    Path of the checkpoint of a case csv
+
+    Args:
+        file_path (str): path of the case csv
+        checkpoint_dir (str): checkpoints folder
+
+    Returns:
+        str: path of the checkpoint file
+    '''
+    return os.path.join(checkpoint_dir, os.path.splitext(os.path.basename(file_path))[0] + '.ckpt')
+
+def new_checkpoint(file_path: str) -> dict:
+    '''
+    Checkpoint of a file that has not been read yet
+
+    Args:
+        file_path (str): path of the case csv
+
+    Returns:
+        dict: 'path', 'offset' (bytes read), 'pending' (incomplete last line), 'state'
+            (StreamState), 'last_change' (time the file last grew), 'finalized', and the 'inode',
+            'mtime_ns', 'head_length' and 'head' (hash of the first bytes) of the file read
+    '''
+    return {
+        'path': os.path.abspath(file_path),
+        'offset': 0,
+        'pending': b'',
+        'state': StreamState(os.path.splitext(os.path.basename(file_path))[0]),
+        'last_change': time.time(),
+        'finalized': False,
+        'inode': None,
+        'mtime_ns': None,
+        'head_length': 0,
+        'head': '',
+    }
+
+def get_head_hash(file_path: str, length: int) -> str:
+    '''
+    SHA-256 of the first 'length' bytes of a file
+
+    Args:
+        file_path (str): path of the file
+        length (int): number of bytes
+
+    Returns:
+        str: hex digest
+    '''
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+def is_replaced(checkpoint: dict, stat: os.stat_result) -> bool:
+    '''
+    Checks if the file of a checkpoint was replaced since it was read: another inode, fewer bytes
+    than were read, different first bytes, or a modification time that changed while the file did
+    not grow (appending always changes it, so it is only compared when nothing was appended)
+
+    Args:
+        checkpoint (dict): checkpoint of the file
+        stat (os.stat_result): current os.stat of the file
+
+    Returns:
+        bool: True if the file must be read again from the start
+    '''
+    if checkpoint['offset'] == 0:
+        return False
+
+    return (checkpoint.get('inode') != stat.st_ino
+        or stat.st_size < checkpoint['offset']
+        or (stat.st_size == checkpoint['offset'] and checkpoint.get('mtime_ns') != stat.st_mtime_ns)
+        or get_head_hash(checkpoint['path'], checkpoint.get('head_length', 0)) != checkpoint.get('head'))
+
+def load_checkpoint(checkpoint_path: str) -> dict | None:
+    '''
+    Reads a checkpoint written by save_checkpoint
+
+    Returns:
+        dict | None: the checkpoint, or None if there is none or it can not be read
+    '''
+    try:
+        with open(checkpoint_path, 'rb') as f:
+            return pickle.load(f)
+
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f'Checkpoint {checkpoint_path} could not be read, the case starts again:', str(e))
+        return None
+
+def save_checkpoint(checkpoint: dict, checkpoint_path: str) -> None:
+    '''
+    Writes a checkpoint under a temporary name first, so an interruption never leaves a partial file
+    '''
+    os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok = True)
+    temporary_path: str = f'{checkpoint_path}.tmp'
+    with open(temporary_path, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol = pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, checkpoint_path)
+
+def read_new_bytes(checkpoint: dict, size: int, checkpoint_path: str) -> None:
+    '''
+    Reads the file from the checkpoint offset up to 'size' and runs the complete lines through
+    the StreamState. The checkpoint is saved after every WATCH_READ_BYTES read
+
+    Args:
+        checkpoint (dict): checkpoint of the file (updated in place)
+        size (int): file size at this poll
+        checkpoint_path (str): where the checkpoint is saved
+    '''
+    state: StreamState = checkpoint['state']
+
+    with open(checkpoint['path'], 'rb') as f:
+        f.seek(checkpoint['offset'])
+        while checkpoint['offset'] < size:
+            chunk: bytes = f.read(min(config.WATCH_READ_BYTES, size - checkpoint['offset']))
+            if not chunk:
+                break
+            *complete, checkpoint['pending'] = (checkpoint['pending'] + chunk).split(b'\n')
+            lines: list[str] = [line.decode('utf-8', errors = 'replace') for line in complete]
+
+            for start in range(0, len(lines), config.STREAM_BLOCK_SAMPLES):
+                for event in state.process_lines(lines[start : start + config.STREAM_BLOCK_SAMPLES]):
+                    print_event(event)
+
+            checkpoint['offset'] += len(chunk)
+            save_checkpoint(checkpoint, checkpoint_path)
+
+def finalize_case(checkpoint: dict, checkpoint_path: str, save: bool) -> dict:
+    '''
+    Processes the incomplete last line, scores the case and marks the checkpoint as finalized
+
+    Args:
+        checkpoint (dict): checkpoint of the file (updated in place)
+        checkpoint_path (str): where the checkpoint is saved
+        save (bool): add the score to the results csv (process_recovery)
+
+    Returns:
+        dict: 'recovery_score' event
+    '''
+    state: StreamState = checkpoint['state']
+
+    # The file may not end with a newline. The line is kept in 'pending' in case the file grows again
+    if checkpoint['pending']:
+        final_state: StreamState = copy.deepcopy(state)
+        final_state.process_lines([checkpoint['pending'].decode('utf-8', errors = 'replace')])
+    else:
+        final_state = state
+
+    event: dict = score_event(final_state.finalize(), save)
+    print_event(event)
+    checkpoint['finalized'] = True
+    save_checkpoint(checkpoint, checkpoint_path)
+
+    return event
+
+def poll_folder(folder: str, checkpoint_dir: str, save: bool = True, settle_time: float = config.WATCH_SETTLE_TIME, checkpoints: dict[str, dict] | None = None) -> list[dict]:
+    '''
+    One pass over the case csv files of a folder: reads what was appended to each file and
+    finalizes the files that have not grown for 'settle_time' seconds
+
+    Args:
+        folder (str): watched folder
+        checkpoint_dir (str): checkpoints folder
+        save (bool): add the scores to the results csv
+        settle_time (float): seconds without growth after which a case is finalized
+        checkpoints (dict[str, dict] | None): checkpoints kept in memory between passes, by file
+            (updated in place). Files not in it are resumed from their checkpoint file
+
+    Returns:
+        list[dict]: 'recovery_score' events of the cases finalized in this pass
+    '''
+    events: list[dict] = []
+    if checkpoints is None:
+        checkpoints = {}
+
+    for name in sorted(os.listdir(folder)):
+        file_path: str = os.path.join(folder, name)
+        if not name.endswith('.csv') or name == CSV.CSV_FILE or not os.path.isfile(file_path):
+            continue
+
+        checkpoint_path: str = get_checkpoint_path(file_path, checkpoint_dir)
+        checkpoint: dict | None = checkpoints.get(file_path) or load_checkpoint(checkpoint_path)
+        stat: os.stat_result = os.stat(file_path)
+        size: int = stat.st_size
+
+        if checkpoint is None or is_replaced(checkpoint, stat):
+            # New file, or a file that was replaced by another one: start from the beginning
+            checkpoint = new_checkpoint(file_path)
+        checkpoints[file_path] = checkpoint
+
+        if size > checkpoint['offset']:
+            checkpoint['last_change'] = time.time()
+            checkpoint['finalized'] = False
+            checkpoint['inode'], checkpoint['mtime_ns'] = stat.st_ino, stat.st_mtime_ns
+            if checkpoint['head_length'] < config.WATCH_HEAD_BYTES:
+                checkpoint['head_length'] = min(size, config.WATCH_HEAD_BYTES)
+                checkpoint['head'] = get_head_hash(file_path, checkpoint['head_length'])
+            try:
+                read_new_bytes(checkpoint, size, checkpoint_path)
+            except (OSError, ValueError) as e:
+                print(f'{name}: could not be processed:', str(e))
+                # The StreamState may be part way through a chunk: resume from the last saved checkpoint
+                checkpoints.pop(file_path, None)
+                continue
+
+        elif not checkpoint['finalized'] and time.time() - checkpoint['last_change'] >= settle_time:
+            events.append(finalize_case(checkpoint, checkpoint_path, save))
+
+    return events
+
+def watch(folder: str, checkpoint_dir: str = config.WATCH_CHECKPOINT_DIR, save: bool = True, once: bool = False) -> None:
+    '''
+    Polls a folder every WATCH_POLL_INTERVAL seconds until interrupted
+
+    Args:
+        folder (str): watched folder
+        checkpoint_dir (str): checkpoints folder
+        save (bool): add the scores to the results csv
+        once (bool): a single pass (e.g. from cron); files still within the settle time are
+            finalized by a later pass
+    '''
+    print(f'watching {folder} (checkpoints in {checkpoint_dir})')
+    checkpoints: dict[str, dict] = {}
+    while True:
+        poll_folder(folder, checkpoint_dir, save, checkpoints = checkpoints)
+        if once:
+            return
+        time.sleep(config.WATCH_POLL_INTERVAL)
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description = 'Scores the case csv files uploaded to a folder as they arrive')
+    parser.add_argument('folder', help = 'folder the loggers upload to')
+    parser.add_argument('--checkpoints', default = config.WATCH_CHECKPOINT_DIR, help = 'checkpoints folder')
+    parser.add_argument('--once', action = 'store_true', help = 'poll the folder once and exit')
+    parser.add_argument('--no-save', dest = 'save', action = 'store_false', help = 'do not add the scores to the results csv')
+    args = parser.parse_args()
+
+    try:
+        watch(args.folder, args.checkpoints, args.save, args.once)
+    except KeyboardInterrupt:
+        print('stopped, the next run resumes from the checkpoints')
+
+if __name__ == "__main__":
+
+    main()